@@ -3,8 +3,9 @@ import base64
 import sys
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, LargeBinary
 from datetime import datetime
+import json
 from dotenv import load_dotenv
 from cryptography.fernet import Fernet
 
@@ -96,6 +97,14 @@ def decrypt_session_id(encrypted_session_id: bytes) -> str:
     """Descriptografa o session_id."""
     return fernet.decrypt(encrypted_session_id).decode()
 
+def encrypt_client_settings(settings: dict) -> bytes:
+    """Criptografa as configurações de um Client instagrapi (cookies, device, uuids)."""
+    return fernet.encrypt(json.dumps(settings).encode())
+
+def decrypt_client_settings(encrypted_settings: bytes) -> dict:
+    """Descriptografa as configurações de um Client instagrapi."""
+    return json.loads(fernet.decrypt(encrypted_settings).decode())
+
 # Cria engine async forçando o uso do asyncpg
 try:
     # Configura connect_args baseado no ssl_mode
@@ -174,4 +183,36 @@ class InstagramAccount(Base):
 
     @session_id.setter
     def session_id(self, value):
-        self.encrypted_session_id = encrypt_session_id(value) 
\ No newline at end of file
+        self.encrypted_session_id = encrypt_session_id(value) 
+
+# Índice persistente username -> user_id (pks do Instagram nunca mudam)
+class InstagramUserIndex(Base):
+    __tablename__ = 'instagram_user_index'
+
+    username = Column(String(64), primary_key=True)  # Sempre em minúsculas
+    user_id = Column(BigInteger, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<InstagramUserIndex {self.username}={self.user_id}>'
+
+# Estado do Client instagrapi por conta (get_settings), para recriar clientes sem login
+class InstagramClientSettings(Base):
+    __tablename__ = 'instagram_client_settings'
+
+    account_id = Column(String(80), primary_key=True)
+    encrypted_settings = Column(LargeBinary, nullable=False)
+    session_fingerprint = Column(String(64), nullable=False)  # sha256 do session_id que gerou o estado
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<InstagramClientSettings {self.account_id}>'
+
+    @property
+    def settings(self):
+        return decrypt_client_settings(self.encrypted_settings)
+
+    @settings.setter
+    def settings(self, value):
+        self.encrypted_settings = encrypt_client_settings(value)
@@ -7,9 +7,11 @@ from dotenv import load_dotenv
 import uvicorn
 from sqlalchemy import text
 
-from database import engine, Base
+from database import engine, Base, AsyncSessionLocal
 from routes.instagram import instagram_router
-from services.redis_cache import init_redis
+from services.redis_cache import init_redis, close_redis
+from services.job_queue import job_queue
+from services.instagram_service import get_instagram_service
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -31,7 +33,9 @@ async def lifespan(app: FastAPI):
                 await conn.run_sync(Base.metadata.create_all)
                 print("✅ Tabelas criadas com sucesso")
             else:
-                print("✅ Tabelas já existem, pulando criação")
+                # Cria apenas as tabelas novas que ainda não existem (ex.: instagram_user_index)
+                await conn.run_sync(Base.metadata.create_all)
+                print("✅ Tabelas já existem, novas tabelas verificadas")
     except Exception as e:
         print(f"⚠️ Aviso: Erro ao verificar/criar tabelas: {e}")
         print("🔄 Tentando criar tabelas diretamente...")
@@ -47,10 +51,28 @@ async def lifespan(app: FastAPI):
     
     # Inicializa conexão Redis
     await init_redis()
+
+    # Inicializa o serviço do Instagram: clientes de todas as contas criados em paralelo,
+    # atendendo assim que o mínimo de contas estiver pronto
+    instagram_service = await get_instagram_service()
+    try:
+        async with AsyncSessionLocal() as db:
+            await instagram_service.initialize(db)
+    except Exception as e:
+        print(f"⚠️ Aviso: Erro ao inicializar o serviço do Instagram: {e}")
+
+    # Pré-aquecimento agendado por um único processo da implantação (lease no Redis)
+    instagram_service.start_warmup_election()
+
+    # Workers de jobs em lote (retomam itens de processos que morreram)
+    job_queue.start()
     
     yield
     
     # Cleanup
+    await job_queue.stop()
+    await instagram_service.shutdown()
+    await close_redis()
     await engine.dispose()
 
 # Cria a aplicação FastAPI
@@ -1,20 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import AsyncIterator, Optional
+import json
 import httpx
-from urllib.parse import quote
 
 from database import get_db, InstagramAccount
-from services.instagram_service import get_instagram_service
-from services.redis_cache import get_cache_stats, clear_cache_pattern
+from services.instagram_service import get_instagram_service, BUNDLE_PARTS
+from services.redis_cache import get_cache_stats, clear_cache_pattern, cached_json
+from services.job_queue import job_queue
 from schemas import (
     LoginRequest, LoginResponse, AccountsListResponse, ProfileResponse,
-    StoriesResponse, PostsResponse, ReelsResponse, PrivacyResponse
+    StoriesResponse, PostsResponse, ReelsResponse, PrivacyResponse,
+    UserIndexPreloadRequest, UserIndexPreloadResponse, ProfileBundleResponse,
+    BatchLookupRequest, BatchLookupResponse, BatchStreamRequest,
+    JobCreateRequest, JobCreateResponse, JobStatusResponse, JobResultsResponse
 )
 
 instagram_router = APIRouter()
 
+def _json_response(body: str) -> Response:
+    """Envia o JSON já validado e serializado no cache, sem nova validação/serialização"""
+    return Response(content=body, media_type="application/json")
+
 @instagram_router.get("/accounts", response_model=AccountsListResponse)
 async def list_accounts(db: AsyncSession = Depends(get_db)):
     """Lista todas as contas salvas no banco de dados."""
@@ -73,19 +81,15 @@ async def get_profile_info(username: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Username is required")
 
     service = await get_instagram_service()
-    result = await service.get_profile_info(username, db)
+    body, result = await cached_json(service.get_profile_info, username, db)
+    if body is not None:
+        return _json_response(body)
 
     if result['status'] == 'error':
         status_code = 404 if "not found" in result.get("message", "") else 500
         raise HTTPException(status_code=status_code, detail=result.get("message"))
     
-    data = result.get("data")
-    if data and data.get("profile_pic_url"):
-        # Adiciona o domínio completo antes do endpoint
-        proxy_url = f"https://insta-api.gfollow.store/api/v1/proxy-image?url={quote(data['profile_pic_url'])}"
-        data["profile_pic_proxy_url"] = proxy_url
-    
-    return {"success": True, "data": data}
+    return result
 
 @instagram_router.get("/users/{username}/privacy", response_model=PrivacyResponse)
 async def check_user_privacy(username: str, db: AsyncSession = Depends(get_db)):
@@ -96,7 +100,9 @@ async def check_user_privacy(username: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Username is required")
 
     service = await get_instagram_service()
-    result = await service.get_profile_privacy(username, db)
+    body, result = await cached_json(service.get_profile_privacy, username, db)
+    if body is not None:
+        return _json_response(body)
 
     if result['status'] == 'error':
         status_code = 404 if "not found" in result.get("message", "") else 500
@@ -118,7 +124,9 @@ async def get_user_posts(
         raise HTTPException(status_code=400, detail="Username is required")
 
     service = await get_instagram_service()
-    result = await service.get_last_posts(username, count, db)
+    body, result = await cached_json(service.get_last_posts, username, count, db)
+    if body is not None:
+        return _json_response(body)
 
     if result['status'] == 'error':
         raise HTTPException(status_code=500, detail=result['message'])
@@ -139,13 +147,156 @@ async def get_user_reels(
         raise HTTPException(status_code=400, detail="Username is required")
 
     service = await get_instagram_service()
-    result = await service.get_last_reels(username, count, db)
+    body, result = await cached_json(service.get_last_reels, username, count, db)
+    if body is not None:
+        return _json_response(body)
 
     if result['status'] == 'error':
         raise HTTPException(status_code=500, detail=result['message'])
     
     return result
 
+@instagram_router.get("/users/{username}/bundle", response_model=ProfileBundleResponse)
+async def get_profile_bundle(
+    username: str,
+    parts: str = Query(",".join(BUNDLE_PARTS), description="Partes separadas por vírgula: profile, privacy, posts, reels"),
+    count: int = Query(4, ge=1, le=12),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Obtém perfil, privacidade, posts e reels em uma única requisição.
+    O usuário é resolvido uma vez e os caches dos endpoints individuais são preenchidos.
+    """
+    if not username:
+        raise HTTPException(status_code=400, detail="Username is required")
+
+    requested = [part.strip() for part in parts.split(",") if part.strip()]
+    invalid = [part for part in requested if part not in BUNDLE_PARTS]
+    if not requested or invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid parts: {', '.join(invalid) or parts}")
+
+    service = await get_instagram_service()
+    result = await service.get_profile_bundle(username, requested, count, db)
+
+    if result['status'] == 'error':
+        status_code = 404 if "not found" in result.get("message", "") else 500
+        raise HTTPException(status_code=status_code, detail=result.get("message"))
+
+    return result
+
+@instagram_router.post("/users/batch", response_model=BatchLookupResponse)
+async def batch_lookup(request: BatchLookupRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Consulta vários usernames em uma requisição.
+    O cache é lido em lote e apenas os misses vão ao Instagram, com concorrência limitada.
+    Cada username tem seu próprio status (success, partial ou error).
+    """
+    invalid = [field for field in request.fields if field not in BUNDLE_PARTS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid)}")
+
+    fields = [part for part in BUNDLE_PARTS if part in request.fields]
+    service = await get_instagram_service()
+    return await service.batch_lookup(request.usernames, fields, request.count, db)
+
+async def _ndjson_lines(entries: AsyncIterator[dict]) -> AsyncIterator[str]:
+    async for entry in entries:
+        yield json.dumps(entry, default=str) + "\n"
+
+async def _sse_events(entries: AsyncIterator[dict]) -> AsyncIterator[str]:
+    summary = {"success": 0, "partial": 0, "error": 0}
+    async for entry in entries:
+        summary[entry["status"]] += 1
+        yield f"data: {json.dumps(entry, default=str)}\n\n"
+    yield f"event: end\ndata: {json.dumps(summary)}\n\n"
+
+@instagram_router.post("/users/batch/stream")
+async def batch_lookup_stream(
+    request: BatchStreamRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Versão em streaming de /users/batch para lotes grandes.
+    Cada username é enviado (NDJSON ou SSE) assim que fica pronto, na ordem em que resolve;
+    se o cliente lê devagar, as consultas pausam (memória constante).
+    """
+    invalid = [field for field in request.fields if field not in BUNDLE_PARTS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid)}")
+
+    fields = [part for part in BUNDLE_PARTS if part in request.fields]
+    service = await get_instagram_service()
+    # A sessão db é usada apenas aqui: ela é fechada antes do streaming começar
+    await service.prepare_batch(db)
+    entries = service.stream_batch(request.usernames, fields, request.count)
+
+    if format == "sse":
+        return StreamingResponse(
+            _sse_events(entries), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    return StreamingResponse(_ndjson_lines(entries), media_type="application/x-ndjson")
+
+@instagram_router.post("/jobs", response_model=JobCreateResponse)
+async def create_job(request: JobCreateRequest):
+    """
+    Cria um job de consulta em lote processado em segundo plano.
+    Use GET /jobs/{job_id} para acompanhar o progresso e /jobs/{job_id}/results para os resultados.
+    """
+    invalid = [field for field in request.fields if field not in BUNDLE_PARTS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid)}")
+
+    fields = [part for part in BUNDLE_PARTS if part in request.fields]
+    result = await job_queue.submit(request.usernames, fields, request.count)
+    if result['status'] == 'error':
+        status_code = 400 if "usernames" in result['message'] else 503
+        raise HTTPException(status_code=status_code, detail=result['message'])
+    return result
+
+@instagram_router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Retorna estado e progresso de um job"""
+    job = await job_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+@instagram_router.get("/jobs/{job_id}/results", response_model=JobResultsResponse)
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Retorna uma página dos resultados já concluídos de um job"""
+    results = await job_queue.get_results(job_id, offset, limit)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return results
+
+@instagram_router.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Cancela um job e remove seus resultados"""
+    if await job_queue.delete_job(job_id):
+        return {"status": "success", "message": f"Job {job_id} deleted successfully."}
+    raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+
+@instagram_router.post("/index/preload", response_model=UserIndexPreloadResponse)
+async def preload_user_index(request: UserIndexPreloadRequest):
+    """
+    Pré-carrega o índice persistente username -> user_id.
+    Usernames já indexados não geram chamadas ao Instagram.
+    """
+    service = await get_instagram_service()
+    return await service.preload_user_index(request.usernames)
+
+@instagram_router.get("/index/stats")
+async def get_user_index_stats():
+    """Retorna estatísticas do índice username -> user_id"""
+    service = await get_instagram_service()
+    return await service.get_user_index_stats()
+
 @instagram_router.get("/proxy-image")
 async def proxy_image(url: str):
     """
@@ -195,6 +346,27 @@ async def stop_account_warmup(username: str):
     await service.stop_account_warmup(username)
     return {"status": "success", "message": f"Pré-aquecimento parado para conta {username}"}
 
+@instagram_router.post("/accounts/{username}/warmup/pause")
+async def pause_account_warmup(username: str):
+    """Pausa o pré-aquecimento de uma conta sem removê-la do agendamento"""
+    service = await get_instagram_service()
+    await service.pause_account_warmup(username)
+    return {"status": "success", "message": f"Pré-aquecimento pausado para conta {username}"}
+
+@instagram_router.post("/accounts/{username}/warmup/resume")
+async def resume_account_warmup(username: str):
+    """Retoma o pré-aquecimento de uma conta pausada"""
+    service = await get_instagram_service()
+    await service.resume_account_warmup(username)
+    return {"status": "success", "message": f"Pré-aquecimento retomado para conta {username}"}
+
+@instagram_router.post("/warmup/system/start")
+async def start_warmup_system():
+    """Reabilita o sistema de pré-aquecimento parado por /warmup/system/stop"""
+    service = await get_instagram_service()
+    await service.start_warmup_system()
+    return {"status": "success", "message": "Sistema de pré-aquecimento iniciado"}
+
 @instagram_router.post("/warmup/system/stop")
 async def stop_warmup_system():
     """Para o sistema de pré-aquecimento completo"""
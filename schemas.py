@@ -41,6 +41,8 @@ class ProfileInfo(BaseModel):
     last_updated: Optional[datetime] = None
 
 class ProfileResponse(BaseModel):
+    # Usado internamente (ex.: só resultados com status success são cacheados); fica fora da resposta
+    status: Optional[str] = Field(None, exclude=True)
     success: bool
     data: Optional[ProfileInfo] = None
     message: Optional[str] = None
@@ -76,6 +78,87 @@ class PrivacyResponse(BaseModel):
     privacy: str
     source: str
 
+# Schemas para o endpoint combinado (cada parte tem o mesmo formato do endpoint individual)
+class ProfileBundleResponse(BaseModel):
+    status: str
+    username: str
+    cached: List[str] = []
+    profile: Optional[Dict[str, Any]] = None
+    privacy: Optional[Dict[str, Any]] = None
+    posts: Optional[Dict[str, Any]] = None
+    reels: Optional[Dict[str, Any]] = None
+
+# Schemas para a consulta em lote
+class BatchLookupRequest(BaseModel):
+    usernames: List[str] = Field(..., min_length=1, max_length=1000, description="Usernames a serem consultados")
+    fields: List[str] = Field(["profile", "privacy"], min_length=1, description="Campos: profile, privacy, posts, reels")
+    count: int = Field(4, ge=1, le=12, description="Quantidade de posts/reels")
+
+class BatchStreamRequest(BatchLookupRequest):
+    usernames: List[str] = Field(..., min_length=1, max_length=20000, description="Usernames a serem consultados")
+
+class BatchLookupItem(BaseModel):
+    username: str
+    status: str
+    message: Optional[str] = None
+    cached: List[str] = []
+    profile: Optional[Dict[str, Any]] = None
+    privacy: Optional[Dict[str, Any]] = None
+    posts: Optional[Dict[str, Any]] = None
+    reels: Optional[Dict[str, Any]] = None
+
+class BatchLookupResponse(BaseModel):
+    status: str
+    requested: int
+    from_cache: int
+    success: int
+    partial: int
+    error: int
+    results: List[BatchLookupItem]
+
+# Schemas para jobs de consulta em lote
+class JobCreateRequest(BatchLookupRequest):
+    usernames: List[str] = Field(..., min_length=1, max_length=100000, description="Usernames a serem consultados")
+
+class JobCreateResponse(BaseModel):
+    status: str
+    job_id: str
+    total: int
+
+class JobStatusResponse(BaseModel):
+    status: str
+    job_id: str
+    state: str
+    fields: List[str]
+    total: int
+    done: int
+    progress: float
+    success: int
+    partial: int
+    error: int
+    created_at: float
+    updated_at: float
+    finished_at: Optional[float] = None
+
+class JobResultsResponse(BaseModel):
+    status: str
+    job_id: str
+    offset: int
+    limit: int
+    total_results: int
+    results: List[BatchLookupItem]
+
+# Schemas para o índice username -> user_id
+class UserIndexPreloadRequest(BaseModel):
+    usernames: List[str] = Field(..., min_length=1, max_length=1000, description="Usernames a serem indexados")
+
+class UserIndexPreloadResponse(BaseModel):
+    status: str
+    requested: int
+    already_indexed: int
+    resolved: int
+    not_found: List[str]
+
 # Schemas para respostas de erro
 class ErrorResponse(BaseModel):
     status: str
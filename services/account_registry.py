@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from services.redis_cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Canal pub/sub com as alterações de contas (login, remoção, nova sessão) entre os workers
+ACCOUNT_EVENTS_CHANNEL = "accounts:events"
+
+ACCOUNT_ADDED = "added"
+ACCOUNT_REMOVED = "removed"
+ACCOUNT_REFRESHED = "refreshed"
+
+
+class AccountRegistry:
+    """
+    Sincroniza o registro de contas entre os workers via Redis pub/sub.
+
+    O worker que altera uma conta publica apenas o evento e o account_id (o session_id
+    nunca passa pelo canal); os demais aplicam a alteração lendo a conta do banco. Como
+    pub/sub não guarda mensagens, a cada (re)conexão on_connect é chamado para uma
+    ressincronização completa, cobrindo eventos perdidos enquanto o Redis estava fora.
+    """
+
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"published": 0, "received": 0, "resyncs": 0}
+
+    async def publish(self, event: str, account_id: str):
+        """Avisa os outros workers de uma alteração já gravada no banco"""
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                message = json.dumps({"event": event, "account_id": account_id, "origin": self.origin})
+                await redis_conn.publish(ACCOUNT_EVENTS_CHANNEL, message)
+                self.stats["published"] += 1
+        except Exception as e:
+            logger.error(f"Erro ao publicar evento de conta ({event} {account_id}): {e}")
+
+    def start(
+        self, on_event: Callable[[str, str], Awaitable[None]], on_connect: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        """Inicia (uma vez por worker) a escuta dos eventos publicados pelos outros workers"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._listen(on_event, on_connect))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self, on_event: Callable[[str, str], Awaitable[None]], on_connect):
+        while True:
+            pubsub = None
+            try:
+                redis_conn = await get_redis()
+                if redis_conn is None:
+                    await asyncio.sleep(5)
+                    continue
+                pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(ACCOUNT_EVENTS_CHANNEL)
+                if on_connect is not None:
+                    self.stats["resyncs"] += 1
+                    await on_connect()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    if event.get("origin") == self.origin:
+                        continue
+                    self.stats["received"] += 1
+                    logger.info(f"🔄 Evento de conta recebido: {event['event']} {event['account_id']}")
+                    await on_event(event["event"], event["account_id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na escuta de eventos de contas: {e}. Reconectando...")
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    def get_stats(self) -> Dict:
+        return {"origin": self.origin, "listening": self._task is not None and not self._task.done(), **self.stats}
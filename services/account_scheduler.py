@@ -0,0 +1,138 @@
+import logging
+import os
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+
+from instagrapi.exceptions import ClientNotFoundError, NotFoundError, UserNotFound
+
+logger = logging.getLogger(__name__)
+
+# Peso da amostra mais recente nas médias móveis exponenciais (EWMA)
+ACCOUNT_SCHEDULER_EWMA_ALPHA = float(os.getenv("ACCOUNT_SCHEDULER_EWMA_ALPHA", 0.2))
+# Meia-vida (segundos) da taxa de erro de uma conta que deixou de receber tráfego
+ACCOUNT_SCHEDULER_ERROR_HALF_LIFE = float(os.getenv("ACCOUNT_SCHEDULER_ERROR_HALF_LIFE", 60))
+# Quanto a taxa de erro recente multiplica o custo de uma conta (taxa 1.0 -> custo x (1 + penalidade))
+ACCOUNT_SCHEDULER_ERROR_PENALTY = float(os.getenv("ACCOUNT_SCHEDULER_ERROR_PENALTY", 4.0))
+
+# Erros que dizem respeito ao alvo consultado, não à saúde da conta
+_TARGET_ERRORS = (UserNotFound, NotFoundError, ClientNotFoundError)
+
+
+def is_account_error(error: BaseException) -> bool:
+    """Indica se a exceção de uma chamada deve contar contra a saúde da conta"""
+    return not isinstance(error, _TARGET_ERRORS)
+
+
+class AccountStats:
+    __slots__ = ("latency", "error_rate", "in_flight", "calls", "errors", "last_error", "last_error_at", "last_used_at")
+
+    def __init__(self):
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+        self.last_used_at: Optional[float] = None
+
+
+class AccountScheduler:
+    """
+    Escolhe a conta para cada requisição a partir da saúde observada de cada uma.
+
+    Para cada conta são mantidas a latência (EWMA), a taxa de erro recente (EWMA) e as
+    chamadas em andamento. A seleção usa power-of-two-choices: duas contas aleatórias são
+    comparadas e a de menor custo (latência x fila x penalidade de erro) é escolhida, o
+    que concentra o tráfego nas contas saudáveis sem deixar as demais sem amostras.
+    """
+
+    def __init__(self, alpha: float = ACCOUNT_SCHEDULER_EWMA_ALPHA):
+        self.alpha = alpha
+        self._stats: Dict[str, AccountStats] = {}
+
+    def _stats_for(self, account_id: str) -> AccountStats:
+        stats = self._stats.get(account_id)
+        if stats is None:
+            stats = self._stats[account_id] = AccountStats()
+        return stats
+
+    def error_rate(self, stats: AccountStats) -> float:
+        """Taxa de erro que decai com o tempo, para que uma conta evitada volte a ser experimentada"""
+        if not stats.error_rate or stats.last_error_at is None:
+            return stats.error_rate
+        return stats.error_rate * 0.5 ** ((time.time() - stats.last_error_at) / ACCOUNT_SCHEDULER_ERROR_HALF_LIFE)
+
+    def cost(self, account_id: str) -> float:
+        """Custo estimado de usar a conta; contas sem chamadas custam 0 e são experimentadas primeiro"""
+        stats = self._stats_for(account_id)
+        if stats.calls == 0 and stats.in_flight == 0:
+            return 0.0
+        # Conta que só falhou ainda não tem latência: assume a pior observada no pool
+        latency = stats.latency or max((other.latency for other in self._stats.values()), default=0.0) or 1.0
+        return latency * (1 + stats.in_flight) * (1 + ACCOUNT_SCHEDULER_ERROR_PENALTY * self.error_rate(stats))
+
+    def pick(self, account_ids: Iterable[str], exclude: Iterable[str] = ()) -> Optional[str]:
+        """Seleciona uma conta entre account_ids (evitando exclude quando houver alternativa)"""
+        candidates: List[str] = list(account_ids)
+        excluded = set(exclude)
+        if excluded:
+            candidates = [account_id for account_id in candidates if account_id not in excluded] or candidates
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        return first if self.cost(first) <= self.cost(second) else second
+
+    def begin(self, account_id: str) -> float:
+        """Registra o início de uma chamada e retorna o instante para end()"""
+        stats = self._stats_for(account_id)
+        stats.in_flight += 1
+        stats.last_used_at = time.time()
+        return time.monotonic()
+
+    def end(self, account_id: str, started: float, error: Optional[BaseException] = None):
+        """Registra o fim de uma chamada, atualizando latência e taxa de erro"""
+        stats = self._stats_for(account_id)
+        stats.in_flight = max(stats.in_flight - 1, 0)
+        stats.calls += 1
+        failed = error is not None and is_account_error(error)
+        if failed:
+            stats.errors += 1
+            stats.last_error = f"{type(error).__name__}: {error}"[:200]
+            stats.last_error_at = time.time()
+        else:
+            # Erros costumam falhar rápido: só chamadas bem-sucedidas entram na latência
+            elapsed = time.monotonic() - started
+            stats.latency = elapsed if not stats.latency else stats.latency + self.alpha * (elapsed - stats.latency)
+        stats.error_rate = self.error_rate(stats) + self.alpha * ((1.0 if failed else 0.0) - self.error_rate(stats))
+
+    def is_busy(self, account_id: str) -> bool:
+        """Indica se a conta tem chamadas em andamento"""
+        stats = self._stats.get(account_id)
+        return stats is not None and stats.in_flight > 0
+
+    def abandon(self, account_id: str):
+        """Chamada cancelada antes de terminar: só deixa de contar como em andamento"""
+        stats = self._stats_for(account_id)
+        stats.in_flight = max(stats.in_flight - 1, 0)
+
+    def forget(self, account_id: str):
+        self._stats.pop(account_id, None)
+
+    def get_stats(self) -> Dict:
+        return {
+            account_id: {
+                "latency_ms": round(stats.latency * 1000, 1),
+                "error_rate": round(self.error_rate(stats), 3),
+                "in_flight": stats.in_flight,
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "cost": round(self.cost(account_id), 4),
+                "last_error": stats.last_error,
+                "last_error_at": stats.last_error_at,
+            }
+            for account_id, stats in self._stats.items()
+        }
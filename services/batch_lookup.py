@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Dict, List
+
+from services.redis_cache import peek_cached_many
+
+logger = logging.getLogger(__name__)
+
+# Usernames consultados em paralelo no Instagram (misses do cache)
+BATCH_LOOKUP_CONCURRENCY = int(os.getenv("BATCH_LOOKUP_CONCURRENCY", 8))
+# Usernames por MGET no Redis
+BATCH_LOOKUP_MGET_CHUNK = int(os.getenv("BATCH_LOOKUP_MGET_CHUNK", 200))
+
+_DONE = object()
+
+
+def _batch_entry(username: str, fields: List[str], bundle: dict) -> dict:
+    """Resultado de um username: status success (todos os campos), partial ou error"""
+    if bundle.get("status") == "error":
+        return {"username": username, "status": "error", "message": bundle.get("message")}
+
+    entry = {"username": username, "cached": bundle.get("cached", [])}
+    succeeded = 0
+    for field in fields:
+        entry[field] = bundle.get(field)
+        if (entry[field] or {}).get("status") == "success":
+            succeeded += 1
+    entry["status"] = "success" if succeeded == len(fields) else "partial" if succeeded else "error"
+    return entry
+
+
+async def lookup_batch(service, usernames: List[str], fields: List[str], count: int = 4,
+                       concurrency: int = BATCH_LOOKUP_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Consulta vários usernames e gera um resultado por username assim que ele fica pronto.
+
+    Os caches dos endpoints individuais são lidos em blocos com um único MGET (L1 primeiro);
+    apenas os misses vão ao Instagram, via get_profile_bundle, com no máximo `concurrency`
+    usernames em andamento. As filas são limitadas: se o consumidor for lento, a leitura
+    do cache e as consultas pausam (memória constante mesmo para lotes grandes).
+    """
+    fields = list(fields)
+    unique = list(dict.fromkeys(username.strip() for username in usernames if username.strip()))
+    misses: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    calls_for = {
+        "profile": lambda username: (service.get_profile_info, (username,)),
+        "privacy": lambda username: (service.get_profile_privacy, (username,)),
+        "posts": lambda username: (service.get_last_posts, (username, count)),
+        "reels": lambda username: (service.get_last_reels, (username, count)),
+    }
+
+    async def read_cache():
+        try:
+            for start in range(0, len(unique), BATCH_LOOKUP_MGET_CHUNK):
+                chunk = unique[start:start + BATCH_LOOKUP_MGET_CHUNK]
+                cached = await peek_cached_many([calls_for[field](username) for username in chunk for field in fields])
+                for i, username in enumerate(chunk):
+                    values = cached[i * len(fields):(i + 1) * len(fields)]
+                    if all(value is not None for value in values):
+                        bundle = {"status": "success", "cached": fields, **dict(zip(fields, values))}
+                        await results.put(_batch_entry(username, fields, bundle))
+                    else:
+                        await misses.put(username)
+        finally:
+            for _ in range(concurrency):
+                await misses.put(None)
+
+    async def fetch_misses():
+        try:
+            while (username := await misses.get()) is not None:
+                try:
+                    bundle = await service.get_profile_bundle(username, fields, count)
+                except Exception as e:
+                    logger.error(f"Erro na consulta em lote de {username}: {e}")
+                    bundle = {"status": "error", "message": "Failed to retrieve profile"}
+                await results.put(_batch_entry(username, fields, bundle))
+        finally:
+            await results.put(_DONE)
+
+    tasks = [asyncio.create_task(read_cache())]
+    tasks += [asyncio.create_task(fetch_misses()) for _ in range(concurrency)]
+    try:
+        running = concurrency
+        while running:
+            item = await results.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            yield item
+        # Propaga erro inesperado da leitura do cache
+        await tasks[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def collect_batch(service, usernames: List[str], fields: List[str], count: int = 4) -> Dict:
+    """Executa lookup_batch e monta a resposta completa na ordem dos usernames pedidos"""
+    by_username = {}
+    async for entry in lookup_batch(service, usernames, fields, count):
+        by_username[entry["username"]] = entry
+
+    ordered = [by_username[username] for username in dict.fromkeys(u.strip() for u in usernames if u.strip())]
+    summary = {"success": 0, "partial": 0, "error": 0}
+    for entry in ordered:
+        summary[entry["status"]] += 1
+    return {
+        "status": "success",
+        "requested": len(ordered),
+        "from_cache": sum(1 for entry in ordered if set(entry.get("cached", [])) >= set(fields)),
+        **summary,
+        "results": ordered,
+    }
@@ -0,0 +1,137 @@
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from instagrapi.exceptions import (
+    ChallengeRequired, FeedbackRequired, LoginRequired, PleaseWaitFewMinutes, RateLimitError,
+    ClientThrottledError, SentryBlock, ReloginAttemptExceeded,
+)
+
+from services.account_scheduler import is_account_error
+
+logger = logging.getLogger(__name__)
+
+# Falhas consecutivas (de erros comuns) que abrem o circuito de uma conta
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3))
+# Quarentena inicial (segundos), dobrada a cada nova abertura sem recuperação
+CIRCUIT_BASE_COOLDOWN = float(os.getenv("CIRCUIT_BASE_COOLDOWN", 30))
+CIRCUIT_MAX_COOLDOWN = float(os.getenv("CIRCUIT_MAX_COOLDOWN", 1800))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Erros que indicam problema na sessão: abrem o circuito na primeira ocorrência
+_QUARANTINE_ERRORS = (
+    ChallengeRequired, FeedbackRequired, LoginRequired, PleaseWaitFewMinutes, RateLimitError,
+    ClientThrottledError, SentryBlock, ReloginAttemptExceeded,
+)
+
+
+class AccountCircuit:
+    __slots__ = ("state", "failures", "opens", "open_until", "last_error", "opened_at")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self.open_until = 0.0
+        self.last_error: Optional[str] = None
+        self.opened_at: Optional[float] = None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por conta: closed -> open -> half_open -> closed.
+
+    Uma conta sai do rodízio (open) após CIRCUIT_FAILURE_THRESHOLD falhas consecutivas ou
+    imediatamente em erros de sessão (challenge, feedback, login, throttling). Terminada a
+    quarentena, a conta passa a half_open e o serviço faz uma única chamada de teste barata:
+    sucesso a readmite (closed); falha reabre o circuito com quarentena dobrada, até
+    CIRCUIT_MAX_COOLDOWN. A conta nunca é removida do pool.
+    """
+
+    def __init__(self):
+        self._circuits: Dict[str, AccountCircuit] = {}
+
+    def _circuit(self, account_id: str) -> AccountCircuit:
+        circuit = self._circuits.get(account_id)
+        if circuit is None:
+            circuit = self._circuits[account_id] = AccountCircuit()
+        return circuit
+
+    def allow(self, account_id: str) -> bool:
+        """Indica se a conta pode receber tráfego normal"""
+        return self._circuit(account_id).state == CLOSED
+
+    def probe_due(self, account_id: str) -> bool:
+        """
+        Retorna True (uma única vez) quando a quarentena terminou e a conta deve ser testada;
+        a conta passa a half_open até probe_succeeded()/probe_failed().
+        """
+        circuit = self._circuit(account_id)
+        if circuit.state == OPEN and time.time() >= circuit.open_until:
+            circuit.state = HALF_OPEN
+            return True
+        return False
+
+    def record_success(self, account_id: str):
+        circuit = self._circuit(account_id)
+        if circuit.state == CLOSED:
+            circuit.failures = 0
+
+    def record_failure(self, account_id: str, error: BaseException):
+        if not is_account_error(error):
+            return
+        circuit = self._circuit(account_id)
+        if circuit.state != CLOSED:
+            return
+        circuit.failures += 1
+        circuit.last_error = f"{type(error).__name__}: {error}"[:200]
+        if isinstance(error, _QUARANTINE_ERRORS) or circuit.failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self._open(account_id, circuit)
+
+    def trip(self, account_id: str, error: BaseException):
+        """Coloca a conta em quarentena imediatamente (ex.: falha ao criar o cliente)"""
+        circuit = self._circuit(account_id)
+        if circuit.state == CLOSED:
+            circuit.last_error = f"{type(error).__name__}: {error}"[:200]
+            self._open(account_id, circuit)
+
+    def probe_succeeded(self, account_id: str):
+        circuit = self._circuit(account_id)
+        circuit.state = CLOSED
+        circuit.failures = 0
+        circuit.opens = 0
+        logger.info(f"✅ Conta {account_id} readmitida após teste")
+
+    def probe_failed(self, account_id: str, error: BaseException):
+        circuit = self._circuit(account_id)
+        circuit.last_error = f"{type(error).__name__}: {error}"[:200]
+        self._open(account_id, circuit)
+
+    def _open(self, account_id: str, circuit: AccountCircuit):
+        cooldown = min(CIRCUIT_BASE_COOLDOWN * 2 ** circuit.opens, CIRCUIT_MAX_COOLDOWN)
+        circuit.state = OPEN
+        circuit.opens += 1
+        circuit.failures = 0
+        circuit.opened_at = time.time()
+        circuit.open_until = circuit.opened_at + cooldown
+        logger.warning(f"🚫 Conta {account_id} em quarentena por {cooldown:.0f}s ({circuit.last_error})")
+
+    def forget(self, account_id: str):
+        self._circuits.pop(account_id, None)
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        return {
+            account_id: {
+                "state": circuit.state,
+                "consecutive_failures": circuit.failures,
+                "opens": circuit.opens,
+                "retry_in": round(max(circuit.open_until - now, 0), 1) if circuit.state == OPEN else None,
+                "last_error": circuit.last_error,
+            }
+            for account_id, circuit in self._circuits.items()
+        }
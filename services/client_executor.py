@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Número máximo de threads usadas para chamadas bloqueantes do instagrapi
+EXECUTOR_MAX_WORKERS = int(os.getenv("INSTAGRAM_EXECUTOR_WORKERS", 16))
+
+
+class ClientExecutor:
+    """
+    Executa chamadas síncronas do instagrapi fora do event loop.
+
+    Todas as chamadas passam por um ThreadPoolExecutor limitado. Cada conta possui
+    um lock próprio, garantindo que um mesmo Client nunca seja usado por duas
+    threads ao mesmo tempo, enquanto contas diferentes rodam em paralelo.
+    """
+
+    def __init__(self, max_workers: int = EXECUTOR_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="instagrapi")
+        # Lock assíncrono: enfileira as chamadas da conta sem ocupar threads do pool
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+        # Lock de thread: protege o Client mesmo se uma chamada anterior foi cancelada e ainda roda
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._pending = 0
+
+    def _locks_for(self, account_id: str):
+        if account_id not in self._async_locks:
+            self._async_locks[account_id] = asyncio.Lock()
+            self._thread_locks[account_id] = threading.Lock()
+        return self._async_locks[account_id], self._thread_locks[account_id]
+
+    async def run(self, account_id: Optional[str], func: Callable, *args, **kwargs) -> Any:
+        """
+        Executa func(*args, **kwargs) em uma thread do pool.
+        Se account_id for informado, a chamada é serializada com as demais da mesma conta.
+        """
+        loop = asyncio.get_running_loop()
+        call = partial(func, *args, **kwargs)
+
+        if account_id is None:
+            return await loop.run_in_executor(self._executor, call)
+
+        async_lock, thread_lock = self._locks_for(account_id)
+
+        def locked_call():
+            with thread_lock:
+                return call()
+
+        self._pending += 1
+        try:
+            async with async_lock:
+                return await loop.run_in_executor(self._executor, locked_call)
+        finally:
+            self._pending -= 1
+
+    def forget(self, account_id: str):
+        """Remove os locks de uma conta removida do pool"""
+        self._async_locks.pop(account_id, None)
+        self._thread_locks.pop(account_id, None)
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas do executor"""
+        return {
+            "max_workers": self.max_workers,
+            "accounts": len(self._async_locks),
+            "pending_calls": self._pending,
+        }
+
+    def shutdown(self):
+        """Finaliza o pool de threads sem aguardar chamadas pendentes"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
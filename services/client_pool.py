@@ -0,0 +1,105 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from instagrapi import Client
+
+logger = logging.getLogger(__name__)
+
+# Máximo de Clients vivos por worker (0 = sem limite)
+CLIENT_POOL_MAX_SIZE = int(os.getenv("CLIENT_POOL_MAX_SIZE", 50))
+# Clients sem uso por este tempo (segundos) são descartados (0 = nunca)
+CLIENT_POOL_IDLE_TTL = float(os.getenv("CLIENT_POOL_IDLE_TTL", 1800))
+# Intervalo mínimo entre duas varreduras de clients ociosos
+CLIENT_POOL_SWEEP_INTERVAL = 60
+
+
+class ClientPool:
+    """
+    Clients instagrapi vivos deste worker, limitados por LRU e por tempo ocioso.
+
+    Interface de dicionário (get, in, [], pop) para substituir o antigo Dict de clientes.
+    Ao ser descartado, o Client é entregue a on_evict (que salva seu estado com
+    get_settings), e o próximo uso o recria localmente a partir desse estado, sem login.
+    Clientes com chamadas em andamento (is_busy) não são descartados.
+    """
+
+    def __init__(
+        self, on_evict: Callable[[str, Client], None], is_busy: Callable[[str], bool] = lambda account_id: False,
+        max_size: int = CLIENT_POOL_MAX_SIZE, idle_ttl: float = CLIENT_POOL_IDLE_TTL
+    ):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._on_evict = on_evict
+        self._is_busy = is_busy
+        # account_id -> (Client, último uso em time.monotonic), do menos para o mais recente
+        self._clients: "OrderedDict[str, tuple]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self.stats = {"evicted_lru": 0, "evicted_idle": 0}
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._clients
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __getitem__(self, account_id: str) -> Client:
+        client = self.get(account_id)
+        if client is None:
+            raise KeyError(account_id)
+        return client
+
+    def get(self, account_id: str, default: Optional[Client] = None) -> Optional[Client]:
+        entry = self._clients.get(account_id)
+        if entry is None:
+            return default
+        self._clients[account_id] = (entry[0], time.monotonic())
+        self._clients.move_to_end(account_id)
+        self._maybe_sweep()
+        return entry[0]
+
+    def __setitem__(self, account_id: str, client: Client):
+        self._clients[account_id] = (client, time.monotonic())
+        self._clients.move_to_end(account_id)
+        self._enforce_limit()
+        self._maybe_sweep()
+
+    def pop(self, account_id: str, default: Optional[Client] = None) -> Optional[Client]:
+        """Remove sem chamar on_evict (cliente inválido ou conta removida)"""
+        entry = self._clients.pop(account_id, None)
+        return entry[0] if entry is not None else default
+
+    def _evict(self, account_id: str, reason: str):
+        client, _ = self._clients.pop(account_id)
+        self.stats[f"evicted_{reason}"] += 1
+        try:
+            self._on_evict(account_id, client)
+        except Exception as e:
+            logger.error(f"Erro ao descartar o cliente da conta {account_id}: {e}")
+        logger.debug(f"♻️ Cliente da conta {account_id} descartado ({reason})")
+
+    def _enforce_limit(self):
+        if self.max_size <= 0:
+            return
+        # Do menos recente para o mais recente, pulando os que estão em uso
+        for account_id in list(self._clients):
+            if len(self._clients) <= self.max_size:
+                break
+            if not self._is_busy(account_id):
+                self._evict(account_id, "lru")
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if self.idle_ttl <= 0 or now - self._last_sweep < CLIENT_POOL_SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        for account_id, (_, last_used) in list(self._clients.items()):
+            if now - last_used < self.idle_ttl:
+                break  # ordenados por uso: os demais são mais recentes
+            if not self._is_busy(account_id):
+                self._evict(account_id, "idle")
+
+    def get_stats(self) -> Dict:
+        return {"live": len(self._clients), "max_size": self.max_size, "idle_ttl": self.idle_ttl, **self.stats}
@@ -0,0 +1,123 @@
+import copy
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database import AsyncSessionLocal, InstagramClientSettings, encrypt_client_settings
+
+logger = logging.getLogger(__name__)
+
+# Recria os clientes a partir do estado salvo em vez de fazer login_by_sessionid a cada processo
+CLIENT_SETTINGS_ENABLED = os.getenv("CLIENT_SETTINGS_ENABLED", "true").lower() == "true"
+
+
+def session_fingerprint(session_id: str) -> str:
+    """Identifica o session_id que gerou o estado salvo sem guardá-lo em claro"""
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+class ClientSettingsStore:
+    """
+    Estado dos Clients instagrapi (get_settings: cookies, device, uuids) por conta,
+    criptografado na tabela instagram_client_settings.
+
+    Um processo novo recria o cliente localmente com esse estado, sem chamadas de rede;
+    o login_by_sessionid só acontece quando não há estado para o session_id atual da conta
+    ou depois de uma falha de autenticação (invalidate).
+    """
+
+    def __init__(self, enabled: bool = CLIENT_SETTINGS_ENABLED):
+        self.enabled = enabled
+        # account_id -> (fingerprint do session_id, settings)
+        self._memory: Dict[str, Tuple[str, dict]] = {}
+        self.stats = {"restored": 0, "logins": 0, "saved": 0, "invalidated": 0}
+
+    async def preload(self):
+        """Carrega o estado de todas as contas com uma única consulta (na inicialização)"""
+        if not self.enabled:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(InstagramClientSettings))
+                rows = result.scalars().all()
+            for row in rows:
+                try:
+                    self._memory[row.account_id] = (row.session_fingerprint, row.settings)
+                except Exception as e:
+                    logger.error(f"Erro ao descriptografar o estado do cliente da conta {row.account_id}: {e}")
+            logger.info(f"🔐 Estado de {len(self._memory)} clientes carregado do banco")
+        except Exception as e:
+            logger.error(f"Erro ao carregar o estado dos clientes: {e}")
+
+    async def get(self, account_id: str, session_id: str) -> Optional[dict]:
+        """Estado salvo para o session_id atual da conta, ou None (exige login)"""
+        if not self.enabled:
+            return None
+        fingerprint = session_fingerprint(session_id)
+        entry = self._memory.get(account_id)
+        if entry is None:
+            # Outro worker pode ter feito o login depois do preload
+            try:
+                async with AsyncSessionLocal() as session:
+                    row = await session.get(InstagramClientSettings, account_id)
+                if row is not None:
+                    entry = self._memory[account_id] = (row.session_fingerprint, row.settings)
+            except Exception as e:
+                logger.error(f"Erro ao consultar o estado do cliente da conta {account_id}: {e}")
+        if entry is None or entry[0] != fingerprint:
+            return None
+        # O Client altera o dicionário de settings (ex.: login): cada cliente recebe uma cópia
+        return copy.deepcopy(entry[1])
+
+    async def save(self, account_id: str, session_id: str, settings: dict):
+        """Grava (upsert) o estado do cliente após um login"""
+        if not self.enabled:
+            return
+        fingerprint = session_fingerprint(session_id)
+        self._memory[account_id] = (fingerprint, copy.deepcopy(settings))
+        try:
+            stmt = insert(InstagramClientSettings).values(
+                account_id=account_id,
+                encrypted_settings=encrypt_client_settings(settings),
+                session_fingerprint=fingerprint,
+                updated_at=datetime.utcnow(),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[InstagramClientSettings.account_id],
+                set_={
+                    "encrypted_settings": stmt.excluded.encrypted_settings,
+                    "session_fingerprint": stmt.excluded.session_fingerprint,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            async with AsyncSessionLocal() as session:
+                await session.execute(stmt)
+                await session.commit()
+            self.stats["saved"] += 1
+        except Exception as e:
+            logger.error(f"Erro ao salvar o estado do cliente da conta {account_id}: {e}")
+
+    async def invalidate(self, account_id: str):
+        """Descarta o estado salvo (falha de autenticação ou conta removida): o próximo cliente faz login"""
+        self._memory.pop(account_id, None)
+        if not self.enabled:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(delete(InstagramClientSettings).where(InstagramClientSettings.account_id == account_id))
+                await session.commit()
+            self.stats["invalidated"] += 1
+        except Exception as e:
+            logger.error(f"Erro ao remover o estado do cliente da conta {account_id}: {e}")
+
+    def forget(self, account_id: str):
+        """Descarta só a cópia em memória (o estado no banco foi alterado por outro worker)"""
+        self._memory.pop(account_id, None)
+
+    def get_stats(self) -> Dict:
+        return {"enabled": self.enabled, "stored": len(self._memory), **self.stats}
@@ -0,0 +1,96 @@
+import logging
+import os
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hedging é opcional: quando ativo, uma chamada lenta é repetida em uma segunda conta
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+# Percentil da latência observada da conta a partir do qual a segunda chamada é disparada
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0.95))
+# Limites do atraso antes da segunda chamada (segundos)
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 0.2))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", 5.0))
+# Amostras de latência mantidas por conta e tipo de operação, e mínimo para usar as da própria conta
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", 200))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+# Orçamento: no máximo esta fração de chamadas extras, com uma pequena reserva para rajadas
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", 0.05))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", 5))
+
+
+def _percentile(samples, percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * percentile), len(ordered) - 1)]
+
+
+class HedgePolicy:
+    """
+    Decide quando repetir uma chamada lenta em outra conta.
+
+    Guarda as latências recentes de cada operação bem-sucedida por conta e tipo de
+    chamada; a segunda chamada é disparada quando a primeira passa do percentil
+    HEDGE_PERCENTILE da conta (ou do pool, enquanto a conta tem poucas amostras).
+    Cada chamada principal credita HEDGE_BUDGET_RATIO ao orçamento e cada hedge
+    consome 1, então as chamadas extras ficam limitadas a essa fração da carga.
+    """
+
+    def __init__(self, enabled: bool = HEDGE_ENABLED, percentile: float = HEDGE_PERCENTILE):
+        self.enabled = enabled
+        self.percentile = percentile
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._budget = HEDGE_BUDGET_BURST
+        self.stats = {"primaries": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+
+    def record(self, account_id: str, kind: str, elapsed: float):
+        samples = self._samples.get((account_id, kind))
+        if samples is None:
+            samples = self._samples[(account_id, kind)] = deque(maxlen=HEDGE_WINDOW)
+        samples.append(elapsed)
+
+    def delay(self, account_id: str, kind: str) -> Optional[float]:
+        """Atraso até a segunda chamada, ou None se ainda não há amostras suficientes"""
+        samples = self._samples.get((account_id, kind))
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            samples = [
+                elapsed for (other_id, other_kind), values in self._samples.items()
+                if other_kind == kind for elapsed in values
+            ]
+            if len(samples) < HEDGE_MIN_SAMPLES:
+                return None
+        return min(max(_percentile(samples, self.percentile), HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def on_primary(self):
+        self.stats["primaries"] += 1
+        self._budget = min(self._budget + HEDGE_BUDGET_RATIO, HEDGE_BUDGET_BURST)
+
+    def try_hedge(self) -> bool:
+        """Consome orçamento para uma chamada extra; False se esgotado"""
+        if self._budget < 1:
+            self.stats["budget_denied"] += 1
+            return False
+        self._budget -= 1
+        self.stats["hedged"] += 1
+        return True
+
+    def on_hedge_win(self):
+        self.stats["hedge_wins"] += 1
+
+    def forget(self, account_id: str):
+        for key in [key for key in self._samples if key[0] == account_id]:
+            del self._samples[key]
+
+    def get_stats(self) -> Dict:
+        delays = {}
+        for kind in sorted({kind for _, kind in self._samples}):
+            samples = [elapsed for (_, other_kind), values in self._samples.items() if other_kind == kind for elapsed in values]
+            if samples:
+                delays[kind] = round(_percentile(samples, self.percentile) * 1000, 1)
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "budget": round(self._budget, 2),
+            "pool_delay_ms": delays,
+            **self.stats,
+        }
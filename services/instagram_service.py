@@ -3,7 +3,9 @@ import os
 import random
 import asyncio
 import time
-from typing import Dict, Optional, List
+from contextvars import ContextVar
+from urllib.parse import quote
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, List, Set, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -11,15 +13,61 @@ from sqlalchemy.orm import selectinload
 
 from dotenv import load_dotenv
 from instagrapi import Client
-from instagrapi.exceptions import BadPassword, TwoFactorRequired, ChallengeRequired, FeedbackRequired
+from instagrapi.exceptions import BadPassword, TwoFactorRequired, ChallengeRequired, FeedbackRequired, LoginRequired, UserNotFound
 
-from services.redis_cache import redis_cache
-from database import InstagramAccount
+from services.redis_cache import redis_cache, peek_cached, prime_cached, get_redis, is_cache_refresh
+from services.client_executor import ClientExecutor
+from services.account_scheduler import AccountScheduler
+from services.circuit_breaker import CircuitBreaker
+from services.rate_limiter import RateLimiter, call_kind
+from services.hedging import HedgePolicy
+from services.client_settings import ClientSettingsStore
+from services.client_pool import ClientPool
+from services.pool_initializer import PoolInitializer, READY, FAILED
+from services.account_registry import AccountRegistry, ACCOUNT_ADDED, ACCOUNT_REMOVED, ACCOUNT_REFRESHED
+from services.leader_election import LeaderElection
+from services.warmup_scheduler import WarmupScheduler
+from services.retry_policy import (
+    NoAccountAvailable, is_retryable, backoff_delay, RETRY_MAX_ATTEMPTS, RETRY_DEADLINE
+)
+from services.user_index import UserIndex
+from services.batch_lookup import lookup_batch, collect_batch
+from services.media_timeline import (
+    MediaTimelineCache, MediaFetchError, MEDIA_TIMELINE_MIN_WINDOW, MEDIA_TIMELINE_REFRESH_MAX_AGE,
+    timeline_posts, timeline_reels
+)
+from database import AsyncSessionLocal, InstagramAccount
+from schemas import ProfileResponse, PostsResponse, ReelsResponse, PrivacyResponse
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# URL pública do proxy de imagens (evita CORS nas fotos de perfil)
+PROXY_IMAGE_BASE_URL = os.getenv("PROXY_IMAGE_BASE_URL", "https://insta-api.gfollow.store/api/v1/proxy-image")
+
+# Contas com pré-aquecimento pausado ou parado e parada do sistema inteiro (compartilhados:
+# o agendador roda só no processo líder, mas os pedidos chegam a qualquer worker)
+WARMUP_PAUSED_KEY = "warmup:paused"
+WARMUP_STOPPED_KEY = "warmup:stopped"
+WARMUP_SYSTEM_STOPPED_KEY = "warmup:system:stopped"
+# Janela (segundos) de atividade real considerada pelo pré-aquecimento
+WARMUP_ACTIVE_WINDOW = float(os.getenv("WARMUP_ACTIVE_WINDOW", 1800))
+# Chamadas reais na janela a partir das quais o pré-aquecimento é dispensado (abaixo disso, só atividades leves)
+WARMUP_ACTIVE_CALLS = int(os.getenv("WARMUP_ACTIVE_CALLS", 20))
+# Chamadas pendentes no executor a partir das quais o pré-aquecimento é adiado
+WARMUP_BUSY_PENDING_CALLS = int(os.getenv("WARMUP_BUSY_PENDING_CALLS", 8))
+WARMUP_BUSY_DELAY = float(os.getenv("WARMUP_BUSY_DELAY", 120))
+
+# Contagem de chamadas reais por conta em baldes de meia janela, somada por todos os workers
+WARMUP_ACTIVITY_PREFIX = "warmup:activity:"
+
+# Marca as chamadas feitas pelo pré-aquecimento, que não contam como atividade real da conta
+_warmup_call: ContextVar[bool] = ContextVar("warmup_call", default=False)
+
+# Partes disponíveis no endpoint combinado /users/{username}/bundle
+BUNDLE_PARTS = ("profile", "privacy", "posts", "reels")
+
 # iPhone device settings (consider moving to a config file)
 IPHONE_DEVICES = [
     {
@@ -37,6 +85,20 @@ IPHONE_DEVICES = [
     }
 ]
 
+def _build_client(session_id: str, request_timeout: int = 10) -> Client:
+    """Cria e autentica um Client instagrapi (bloqueante, deve rodar no executor)"""
+    # settings próprio: o padrão do Client é um dicionário compartilhado entre instâncias
+    client = Client(settings={}, request_timeout=request_timeout)
+    device = random.choice(IPHONE_DEVICES)
+    client.set_device(device)
+    client.set_user_agent(device["user_agent"])
+    client.login_by_sessionid(session_id)
+    return client
+
+def _restore_client(settings: dict, request_timeout: int = 10) -> Client:
+    """Recria um Client a partir de get_settings() salvo (sem chamadas de rede)"""
+    return Client(settings=settings, request_timeout=request_timeout)
+
 class AccountManager:
     """
     Gerenciador de contas com sistema de pré-aquecimento e monitoramento.
@@ -46,8 +108,12 @@ class AccountManager:
         self.service = service_instance  # Referência para o InstagramService
         self.accounts_status: Dict[str, Dict] = {}
         self.last_activity: Dict[str, datetime] = {}
-        self.warmup_tasks: Dict[str, asyncio.Task] = {}
+        # Chamadas reais (não de pré-aquecimento) ainda não enviadas ao Redis
+        self._pending_activity: Dict[str, int] = {}
+        self._activity_flush_task: Optional[asyncio.Task] = None
+        self.warmup_scheduler = WarmupScheduler(self._run_warmup)  # Heap de timers + pool fixo de workers
         self.is_running = False
+        self._system_stopped = False  # Parada do sistema quando não há Redis
         self.warmup_logs: List[Dict] = []  # Logs detalhados do pré-aquecimento
         self.max_logs = 1000  # Máximo de logs mantidos
         
@@ -73,7 +139,7 @@ class AccountManager:
         logger.info(f"{emoji} [{account_id}] {activity}: {status} {f'({details})' if details else ''} {f'[{duration:.2f}s]' if duration else ''}")
         
     async def start_warmup_system(self):
-        """Inicia o sistema de pré-aquecimento para todas as contas"""
+        """Inicia o agendador de pré-aquecimento deste processo para todas as contas (líder eleito)"""
         if self.is_running:
             logger.info("Sistema de pré-aquecimento já está rodando")
             return
@@ -82,75 +148,215 @@ class AccountManager:
         self._add_log("SYSTEM", "Warmup System Start", "success", f"Starting warmup for {len(self.accounts_status)} accounts")
         logger.info("🚀 Iniciando sistema de pré-aquecimento de contas")
         
-        # Inicia tarefas de pré-aquecimento para cada conta
-        for account_id in self.accounts_status.keys():
-            await self.start_account_warmup(account_id)
+        # Um único agendador para todas as contas (cada uma com intervalo aleatório de 15-45 minutos)
+        self.warmup_scheduler.start()
+        for account_id in list(self.accounts_status.keys()):
+            self.schedule_account(account_id)
     
     async def stop_warmup_system(self):
-        """Para o sistema de pré-aquecimento"""
+        """Para o agendador de pré-aquecimento deste processo (perda da liderança)"""
         self.is_running = False
-        self._add_log("SYSTEM", "Warmup System Stop", "success", f"Stopping {len(self.warmup_tasks)} warmup tasks")
+        self._add_log("SYSTEM", "Warmup System Stop", "success", f"Stopping warmup for {self.warmup_scheduler.get_stats()['scheduled']} accounts")
         logger.info("🛑 Parando sistema de pré-aquecimento de contas")
         
-        # Cancela todas as tarefas de pré-aquecimento
-        for task in self.warmup_tasks.values():
-            if not task.done():
-                task.cancel()
-        
-        self.warmup_tasks.clear()
+        # Cancela o despachante e os workers (atividades em andamento são interrompidas)
+        await self.warmup_scheduler.stop()
     
-    async def start_account_warmup(self, account_id: str):
-        """Inicia pré-aquecimento para uma conta específica"""
-        if account_id in self.warmup_tasks and not self.warmup_tasks[account_id].done():
-            self._add_log(account_id, "Warmup Start", "warning", "Warmup already active")
-            logger.info(f"Pré-aquecimento já ativo para conta {account_id}")
+    def schedule_account(self, account_id: str):
+        """Agenda a conta no agendador local (processo líder)"""
+        if self.warmup_scheduler.is_scheduled(account_id):
             return
-            
-        task = asyncio.create_task(self._account_warmup_loop(account_id))
-        self.warmup_tasks[account_id] = task
-        self._add_log(account_id, "Warmup Start", "success", "Warmup task created")
+        self.warmup_scheduler.schedule(account_id)
+        self._add_log(account_id, "Warmup Start", "success", "Warmup scheduled")
         logger.info(f"🔥 Iniciado pré-aquecimento para conta {account_id}")
-    
+
+    def unschedule_account(self, account_id: str):
+        """Remove a conta do agendador local (conta removida)"""
+        if self.warmup_scheduler.is_scheduled(account_id):
+            self.warmup_scheduler.remove(account_id)
+            self._add_log(account_id, "Warmup Stop", "success", "Warmup unscheduled")
+            logger.info(f"🛑 Parado pré-aquecimento para conta {account_id}")
+
+    async def start_account_warmup(self, account_id: str):
+        """Volta a executar o pré-aquecimento de uma conta parada (em toda a implantação)"""
+        redis_conn = await get_redis()
+        if redis_conn is not None:
+            await redis_conn.srem(WARMUP_STOPPED_KEY, account_id)
+        if self.warmup_scheduler.running:
+            self.schedule_account(account_id)
+        self._add_log(account_id, "Warmup Start", "success", "Warmup enabled")
+        logger.info(f"🔥 Pré-aquecimento habilitado para conta {account_id}")
+
     async def stop_account_warmup(self, account_id: str):
-        """Para pré-aquecimento de uma conta específica"""
-        if account_id in self.warmup_tasks:
-            task = self.warmup_tasks[account_id]
-            if not task.done():
-                task.cancel()
-                self._add_log(account_id, "Warmup Stop", "success", "Warmup task cancelled")
-                logger.info(f"🛑 Parado pré-aquecimento para conta {account_id}")
-            del self.warmup_tasks[account_id]
-    
-    async def _account_warmup_loop(self, account_id: str):
-        """Loop principal de pré-aquecimento para uma conta"""
-        while self.is_running:
-            try:
-                # Intervalo variável entre 15-45 minutos
-                interval = random.randint(15, 45) * 60
-                self._add_log(account_id, "Warmup Schedule", "info", f"Next warmup in {interval//60} minutes")
-                logger.info(f"⏰ Próximo pré-aquecimento para {account_id} em {interval//60} minutos")
-                
-                await asyncio.sleep(interval)
-                
-                if not self.is_running:
-                    break
-                    
-                # Executa atividade de pré-aquecimento
-                await self._perform_warmup_activity(account_id)
-                
-            except asyncio.CancelledError:
-                self._add_log(account_id, "Warmup Cancelled", "info", "Warmup loop cancelled")
-                logger.info(f"🛑 Pré-aquecimento cancelado para conta {account_id}")
-                break
-            except Exception as e:
-                self._add_log(account_id, "Warmup Error", "error", f"Loop error: {str(e)}")
-                logger.error(f"❌ Erro no pré-aquecimento da conta {account_id}: {e}")
-                await asyncio.sleep(300)  # Espera 5 minutos antes de tentar novamente
+        """Para o pré-aquecimento de uma conta (em toda a implantação) até start_account_warmup"""
+        redis_conn = await get_redis()
+        if redis_conn is not None:
+            # Verificado pelo líder a cada vencimento: a conta segue no agendador e volta com start
+            await redis_conn.sadd(WARMUP_STOPPED_KEY, account_id)
+        else:
+            self.unschedule_account(account_id)
+        self._add_log(account_id, "Warmup Stop", "success", "Warmup stopped")
+        logger.info(f"🛑 Parado pré-aquecimento para conta {account_id}")
+
+    async def disable_warmup_system(self):
+        """Para o pré-aquecimento de todas as contas (em toda a implantação) até enable_warmup_system"""
+        redis_conn = await get_redis()
+        if redis_conn is not None:
+            await redis_conn.set(WARMUP_SYSTEM_STOPPED_KEY, 1)
+        else:
+            self._system_stopped = True
+        self._add_log("SYSTEM", "Warmup System Stop", "success", "Warmup disabled")
+        logger.info("🛑 Sistema de pré-aquecimento desabilitado")
+
+    async def enable_warmup_system(self):
+        """Reabilita o pré-aquecimento desabilitado por disable_warmup_system"""
+        redis_conn = await get_redis()
+        if redis_conn is not None:
+            await redis_conn.delete(WARMUP_SYSTEM_STOPPED_KEY)
+        self._system_stopped = False
+        self._add_log("SYSTEM", "Warmup System Start", "success", "Warmup enabled")
+        logger.info("🚀 Sistema de pré-aquecimento habilitado")
+
+    async def pause_account_warmup(self, account_id: str):
+        """Pausa o pré-aquecimento da conta (em toda a implantação) sem perder o agendamento"""
+        redis_conn = await get_redis()
+        if redis_conn is not None:
+            # Verificado pelo líder a cada vencimento, qualquer que seja o worker que recebeu o pedido
+            await redis_conn.sadd(WARMUP_PAUSED_KEY, account_id)
+        else:
+            self.warmup_scheduler.pause(account_id)
+        self._add_log(account_id, "Warmup Pause", "success", "Warmup paused")
+        logger.info(f"⏸️ Pré-aquecimento pausado para conta {account_id}")
+
+    async def resume_account_warmup(self, account_id: str):
+        """Retoma o pré-aquecimento de uma conta pausada"""
+        redis_conn = await get_redis()
+        if redis_conn is not None:
+            await redis_conn.srem(WARMUP_PAUSED_KEY, account_id)
+        self.warmup_scheduler.resume(account_id)
+        self._add_log(account_id, "Warmup Resume", "success", "Warmup resumed")
+        logger.info(f"▶️ Pré-aquecimento retomado para conta {account_id}")
+
+    async def _warmup_skip_reason(self, account_id: str) -> Optional[str]:
+        """
+        Paradas e pausas ficam no Redis (feitas em qualquer worker) e são verificadas pelo
+        líder a cada vencimento; sem Redis, valem as locais.
+        """
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                pipe = redis_conn.pipeline(transaction=False)
+                pipe.exists(WARMUP_SYSTEM_STOPPED_KEY)
+                pipe.sismember(WARMUP_STOPPED_KEY, account_id)
+                pipe.sismember(WARMUP_PAUSED_KEY, account_id)
+                system_stopped, stopped, paused = await pipe.execute()
+                if system_stopped:
+                    return "Warmup system stopped"
+                if stopped:
+                    return "Warmup stopped"
+                return "Warmup paused" if paused else None
+        except Exception as e:
+            logger.error(f"Erro ao consultar pausa do pré-aquecimento de {account_id}: {e}")
+        if self._system_stopped:
+            return "Warmup system stopped"
+        return "Warmup paused" if self.warmup_scheduler.is_paused(account_id) else None
+
+    @staticmethod
+    def _activity_bucket(offset: int = 0) -> str:
+        return f"{WARMUP_ACTIVITY_PREFIX}{int(time.time() // (WARMUP_ACTIVE_WINDOW / 2)) - offset}"
+
+    def record_activity(self, account_id: str):
+        """
+        Registra uma chamada real da conta (feita por uma requisição da API). As contagens
+        são agrupadas e enviadas ao Redis a cada segundo, pois o pré-aquecimento roda só no
+        processo líder e precisa enxergar o tráfego de todos os workers.
+        """
+        self._pending_activity[account_id] = self._pending_activity.get(account_id, 0) + 1
+        self.last_activity[account_id] = datetime.utcnow()
+        if self._activity_flush_task is None or self._activity_flush_task.done():
+            self._activity_flush_task = asyncio.create_task(self._flush_activity())
+
+    async def _flush_activity(self):
+        await asyncio.sleep(1)
+        pending, self._pending_activity = self._pending_activity, {}
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is None:
+                return
+            bucket = self._activity_bucket()
+            pipe = redis_conn.pipeline(transaction=False)
+            for account_id, calls in pending.items():
+                pipe.hincrby(bucket, account_id, calls)
+            pipe.expire(bucket, int(WARMUP_ACTIVE_WINDOW))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Erro ao registrar atividade das contas: {e}")
+
+    async def recent_activity(self, account_id: str) -> int:
+        """Chamadas reais da conta (todos os workers) aproximadamente nos últimos WARMUP_ACTIVE_WINDOW segundos"""
+        calls = self._pending_activity.get(account_id, 0)
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                pipe = redis_conn.pipeline(transaction=False)
+                pipe.hget(self._activity_bucket(), account_id)
+                pipe.hget(self._activity_bucket(1), account_id)
+                calls += sum(int(value or 0) for value in await pipe.execute())
+        except Exception as e:
+            logger.error(f"Erro ao consultar atividade da conta {account_id}: {e}")
+        return calls
+
+    def forget(self, account_id: str):
+        self.accounts_status.pop(account_id, None)
+        self._pending_activity.pop(account_id, None)
+        self.last_activity.pop(account_id, None)
+
+    async def _run_warmup(self, account_id: str) -> Optional[float]:
+        """
+        Executado pelo WarmupScheduler quando o pré-aquecimento da conta vence. O
+        pré-aquecimento só usa capacidade ociosa: é adiado com o executor ocupado ou sem
+        orçamento, dispensado se a conta já teve atividade real suficiente e reduzido a
+        atividades leves se ela teve pouca.
+        """
+        if account_id not in self.accounts_status:
+            self.warmup_scheduler.remove(account_id)
+            return None
+        skip_reason = await self._warmup_skip_reason(account_id)
+        if skip_reason:
+            self._add_log(account_id, "Warmup Skipped", "warning", skip_reason)
+            return None
+
+        pending = self.service._executor.get_stats()["pending_calls"]
+        if pending >= WARMUP_BUSY_PENDING_CALLS:
+            self._add_log(account_id, "Warmup Postponed", "info", f"{pending} calls pending in executor")
+            return WARMUP_BUSY_DELAY * random.uniform(0.5, 1.5)
+        # Buckets compartilhados de todos os tipos: o tráfego real usa search/user_info/medias/stories
+        budget_wait = await self.service.rate_limiter.budget_wait(account_id, self.service.rate_limiter.limits)
+        if budget_wait > 0:
+            self._add_log(account_id, "Warmup Postponed", "info", f"No rate budget left (tokens in {budget_wait:.0f}s)")
+            return max(budget_wait, WARMUP_BUSY_DELAY * random.uniform(0.5, 1.5))
+
+        real_calls = await self.recent_activity(account_id)
+        if real_calls >= WARMUP_ACTIVE_CALLS:
+            self._add_log(account_id, "Warmup Skipped", "info", f"Naturally active ({real_calls} real calls)")
+            return None
+
+        token = _warmup_call.set(True)
+        try:
+            await self._perform_warmup_activity(account_id, light=real_calls > 0)
+        finally:
+            _warmup_call.reset(token)
+        return None
     
-    async def _perform_warmup_activity(self, account_id: str):
-        """Executa uma atividade de pré-aquecimento aleatória"""
+    async def _perform_warmup_activity(self, account_id: str, light: bool = False):
+        """Executa uma atividade de pré-aquecimento aleatória (light: apenas uma visualização curta de stories)"""
         try:
-            client = self._get_client_for_account(account_id)
+            # Conta em quarentena não faz pré-aquecimento (o teste de readmissão é feito pelo serviço)
+            if not self.service.breaker.allow(account_id):
+                self._add_log(account_id, "Warmup Skipped", "warning", "Account quarantined by circuit breaker")
+                return
+
+            client = await self._get_client_for_account(account_id)
             if not client:
                 self._add_log(account_id, "Client Creation", "error", "Client not available")
                 logger.warning(f"⚠️ Cliente não disponível para pré-aquecimento da conta {account_id}")
@@ -164,6 +370,9 @@ class AccountManager:
                 self._like_random_post,
                 self._follow_suggestions
             ]
+            if light:
+                # Conta com alguma atividade real recente: pré-aquecimento curto
+                activities = [self._view_stories]
             
             activity = random.choice(activities)
             activity_name = activity.__name__.replace('_', ' ').title()
@@ -196,7 +405,7 @@ class AccountManager:
                 "status": "error"
             }
     
-    def _get_client_for_account(self, account_id: str) -> Optional[Client]:
+    async def _get_client_for_account(self, account_id: str) -> Optional[Client]:
         """Obtém cliente específico para uma conta"""
         session_id = self.service._session_ids.get(account_id)
         if not session_id:
@@ -206,11 +415,7 @@ class AccountManager:
             return self.service._clients[account_id]
         
         try:
-            client = Client(request_timeout=15)
-            device = random.choice(IPHONE_DEVICES)
-            client.set_device(device)
-            client.set_user_agent(device["user_agent"])
-            client.login_by_sessionid(session_id)
+            client = await self.service._create_client(account_id, session_id, 15)
             self.service._clients[account_id] = client
             self._add_log(account_id, "Client Creation", "success", "New client created")
             return client
@@ -223,7 +428,7 @@ class AccountManager:
         """Navega pelo feed principal"""
         try:
             # Obtém algumas postagens do feed
-            feed = client.feed_timeline(amount=random.randint(3, 8))
+            feed = await self.service._run(account_id, client.feed_timeline, amount=random.randint(3, 8))
             
             likes_given = 0
             # Simula tempo de visualização variável
@@ -234,7 +439,7 @@ class AccountManager:
                 # Ocasionalmente curte uma postagem (10% de chance)
                 if random.random() < 0.1:
                     try:
-                        client.media_like(post.id)
+                        await self.service._run(account_id, client.media_like, post.id)
                         likes_given += 1
                         self._add_log(account_id, "Feed Like", "success", f"Liked post {post.id}")
                         await asyncio.sleep(random.uniform(1.0, 3.0))
@@ -252,7 +457,7 @@ class AccountManager:
         """Navega pela página de exploração"""
         try:
             # Obtém posts da página de exploração
-            explore = client.explore_feed(amount=random.randint(5, 12))
+            explore = await self.service._run(account_id, client.explore_feed, amount=random.randint(5, 12))
             
             saves_given = 0
             for post in explore:
@@ -262,7 +467,7 @@ class AccountManager:
                 # Ocasionalmente salva uma postagem (5% de chance)
                 if random.random() < 0.05:
                     try:
-                        client.media_save(post.id)
+                        await self.service._run(account_id, client.media_save, post.id)
                         saves_given += 1
                         self._add_log(account_id, "Explore Save", "success", f"Saved post {post.id}")
                         await asyncio.sleep(random.uniform(1.0, 2.0))
@@ -280,7 +485,7 @@ class AccountManager:
         """Visualiza stories de usuários"""
         try:
             # Obtém stories do feed
-            stories = client.story_feed(amount=random.randint(3, 8))
+            stories = await self.service._run(account_id, client.story_feed, amount=random.randint(3, 8))
             
             reactions_given = 0
             for story in stories:
@@ -291,7 +496,7 @@ class AccountManager:
                 if random.random() < 0.03:
                     try:
                         emoji = random.choice(['❤️', '🔥', '👍', '😍', '👏'])
-                        client.story_react(story.id, emoji)
+                        await self.service._run(account_id, client.story_react, story.id, emoji)
                         reactions_given += 1
                         self._add_log(account_id, "Story Reaction", "success", f"Reacted '{emoji}' to story {story.id}")
                         await asyncio.sleep(random.uniform(1.0, 2.0))
@@ -317,8 +522,8 @@ class AccountManager:
             user = random.choice(popular_users)
             
             # Obtém posts do usuário
-            user_id = client.user_id_from_username(user)
-            posts = client.user_medias(user_id, amount=random.randint(1, 3))
+            user_id = await self.service._run(account_id, client.user_id_from_username, user)
+            posts = await self.service._run(account_id, client.user_medias, user_id, amount=random.randint(1, 3))
             
             likes_given = 0
             for post in posts:
@@ -327,7 +532,7 @@ class AccountManager:
                 
                 # Curti a postagem
                 try:
-                    client.media_like(post.id)
+                    await self.service._run(account_id, client.media_like, post.id)
                     likes_given += 1
                     self._add_log(account_id, "Popular Like", "success", f"Liked post from @{user}")
                     await asyncio.sleep(random.uniform(1.0, 3.0))
@@ -345,7 +550,7 @@ class AccountManager:
         """Interage com sugestões de seguir"""
         try:
             # Obtém sugestões de seguir
-            suggestions = client.user_suggestions(amount=random.randint(3, 6))
+            suggestions = await self.service._run(account_id, client.user_suggestions, amount=random.randint(3, 6))
             
             follows_given = 0
             for user in suggestions:
@@ -355,7 +560,7 @@ class AccountManager:
                 # Ocasionalmente segue um usuário (2% de chance)
                 if random.random() < 0.02:
                     try:
-                        client.user_follow(user.pk)
+                        await self.service._run(account_id, client.user_follow, user.pk)
                         follows_given += 1
                         self._add_log(account_id, "Follow Suggestion", "success", f"Followed @{user.username}")
                         await asyncio.sleep(random.uniform(2.0, 5.0))
@@ -379,7 +584,7 @@ class AccountManager:
             "total_accounts": len(self.accounts_status),
             "active_accounts": len([acc for acc in self.accounts_status.values() if acc.get("status") == "active"]),
             "error_accounts": len([acc for acc in self.accounts_status.values() if acc.get("status") == "error"]),
-            "warmup_tasks": len(self.warmup_tasks),
+            "warmup_scheduler": self.warmup_scheduler.get_stats(),
             "system_running": self.is_running,
             "accounts": self.accounts_status
         }
@@ -395,20 +600,135 @@ class InstagramService:
     """
 
     def __init__(self):
-        self._clients: Dict[str, Client] = {}
         self._session_ids: Dict[str, str] = {}
         self._lock = asyncio.Lock()
         self._account_ids: List[str] = []
-        self._account_index = 0
+        self.scheduler = AccountScheduler()  # Seleção de contas por latência, erros e carga
+        # Clients vivos limitados por LRU/ociosidade; os descartados são recriados do estado salvo
+        self._clients = ClientPool(self._on_client_evicted, self.scheduler.is_busy)
+        self.breaker = CircuitBreaker()  # Quarentena de contas com falhas (sem removê-las do pool)
+        self.rate_limiter = RateLimiter()  # Orçamento por conta compartilhado entre os workers
+        self.hedging = HedgePolicy()  # Segunda chamada em outra conta quando a primeira demora
+        self.client_settings = ClientSettingsStore()  # Estado dos clientes salvo (evita login a cada processo)
+        self.pool_initializer = PoolInitializer()  # Criação paralela dos clientes na inicialização
+        self.registry = AccountRegistry()  # Alterações de contas propagadas entre os workers (pub/sub)
+        self.warmup_leader = LeaderElection("warmup")  # Só o processo líder agenda pré-aquecimentos
+        self._probe_tasks: Dict[str, asyncio.Task] = {}
+        self._save_tasks: Set[asyncio.Task] = set()  # Gravações do estado de clientes descartados pelo pool
         self.account_manager = AccountManager(self) # Passa a instância do serviço
+        self._executor = ClientExecutor()  # Chamadas bloqueantes do instagrapi rodam fora do event loop
+        self.user_index = UserIndex()  # username -> user_id persistente (evita search_users)
+        self.media_timeline = MediaTimelineCache()  # mídias por usuário compartilhadas por posts e reels
         self._initialized = False
         self._init_task = None
 
+    async def _run(self, account_id: Optional[str], func, *args, **kwargs):
+        """
+        Executa uma chamada bloqueante do Client da conta no executor (uma chamada por conta por vez).
+        Cada chamada consome o orçamento da conta; latência, erros e chamadas em andamento
+        alimentam o scheduler de contas.
+        """
+        if account_id is None:
+            return await self._executor.run(None, func, *args, **kwargs)
+
+        # Sem orçamento, a chamada não sai (RateLimitExceeded) e não conta contra a saúde da conta
+        await self.rate_limiter.acquire(account_id, call_kind(func))
+        if not _warmup_call.get():
+            self.account_manager.record_activity(account_id)
+        started = self.scheduler.begin(account_id)
+        try:
+            result = await self._executor.run(account_id, func, *args, **kwargs)
+        except asyncio.CancelledError:
+            # Chamada abandonada (hedge vencido pela outra conta ou prazo esgotado)
+            self.scheduler.abandon(account_id)
+            raise
+        except Exception as e:
+            self.scheduler.end(account_id, started, e)
+            self.breaker.record_failure(account_id, e)
+            if isinstance(e, LoginRequired):
+                await self._on_auth_failure(account_id)
+            raise
+        self.scheduler.end(account_id, started)
+        self.breaker.record_success(account_id)
+        return result
+
+    async def _create_client(self, account_id: str, session_id: str, request_timeout: int = 10, login=None) -> Client:
+        """
+        Recria o Client da conta a partir do estado salvo (sem rede) ou, se não houver estado
+        para o session_id atual, faz login_by_sessionid e salva o estado para os outros processos.
+        login executa o _build_client (padrão: _run, que consome orçamento e alimenta o scheduler).
+        """
+        settings = await self.client_settings.get(account_id, session_id)
+        if settings is not None:
+            self.client_settings.stats["restored"] += 1
+            logger.info(f"🔐 Cliente da conta {account_id} recriado do estado salvo (sem login)")
+            return _restore_client(settings, request_timeout)
+
+        client = await (login or self._run)(account_id, _build_client, session_id, request_timeout)
+        self.client_settings.stats["logins"] += 1
+        await self.client_settings.save(account_id, session_id, client.get_settings())
+        return client
+
+    def _on_client_evicted(self, account_id: str, client: Client):
+        """Salva o estado atual do cliente descartado pelo pool, para recriá-lo depois sem login"""
+        session_id = self._session_ids.get(account_id)
+        if session_id:
+            # Referência mantida até o fim: sem ela a tarefa pode ser coletada antes de gravar
+            task = asyncio.create_task(self.client_settings.save(account_id, session_id, client.get_settings()))
+            self._save_tasks.add(task)
+            task.add_done_callback(self._save_tasks.discard)
+
+    async def _on_auth_failure(self, account_id: str):
+        """Sessão recusada: descarta o cliente e o estado salvo para que o próximo faça login"""
+        logger.warning(f"🔑 Falha de autenticação na conta {account_id}: novo login na próxima criação do cliente")
+        self._clients.pop(account_id, None)
+        await self.client_settings.invalidate(account_id)
+
+    def _available_accounts(self, kinds: Tuple[str, ...] = ()) -> List[str]:
+        """
+        Contas com circuito fechado e orçamento para os tipos de chamada informados;
+        as que terminaram a quarentena recebem um teste em segundo plano.
+        """
+        available = []
+        for account_id in self._account_ids:
+            if self.breaker.allow(account_id):
+                if self.rate_limiter.has_budget(account_id, kinds):
+                    available.append(account_id)
+            elif self.breaker.probe_due(account_id):
+                self._probe_tasks[account_id] = asyncio.create_task(self._probe_account(account_id))
+        return available
+
+    async def _probe_account(self, account_id: str):
+        """Chamada de teste barata (account_info) antes de readmitir a conta"""
+        try:
+            client = self._clients.get(account_id)
+            if client is None:
+                session_id = self._session_ids.get(account_id)
+                if not session_id:
+                    raise ValueError("Session ID not found")
+                client = await self._create_client(account_id, session_id, 10, login=self._executor.run)
+                self._clients[account_id] = client
+            await self._executor.run(account_id, client.account_info)
+            self.breaker.probe_succeeded(account_id)
+        except Exception as e:
+            logger.warning(f"Teste da conta {account_id} falhou: {e}")
+            # O próximo teste recria o cliente (com login se a sessão foi recusada)
+            self._clients.pop(account_id, None)
+            if isinstance(e, LoginRequired):
+                await self.client_settings.invalidate(account_id)
+            self.breaker.probe_failed(account_id, e)
+        finally:
+            self._probe_tasks.pop(account_id, None)
+
     async def initialize(self, db: AsyncSession = None):
         """Inicializa o serviço de forma assíncrona"""
         if self._initialized:
             return
-            
+        async with self._lock:
+            if not self._initialized:
+                await self._initialize(db)
+
+    async def _initialize(self, db: AsyncSession = None):
         logger.info("🚀 Inicializando InstagramService...")
         start_time = time.time()
         
@@ -418,23 +738,42 @@ class InstagramService:
         # Carrega contas do banco se disponível
         if db:
             await self._load_session_ids(db)
+
+        # Pré-carrega o índice username -> user_id
+        await self.user_index.preload()
+
+        # Estado salvo dos clientes: recriados sem login_by_sessionid
+        await self.client_settings.preload()
+
+        # Contas adicionadas/removidas por outros workers chegam via pub/sub (sem polling)
+        self.registry.start(self._on_account_event, self._sync_accounts)
         
-        # Pré-inicializa pelo menos um cliente
-        if self._account_ids:
-            try:
-                account_id = self._account_ids[0]
-                await self._initialize_client(account_id)
-                logger.info(f"✅ Cliente pré-inicializado para {account_id}")
-            except Exception as e:
-                logger.error(f"❌ Erro na pré-inicialização: {e}")
-        
-        # Inicia sistema de pré-aquecimento
-        if self._account_ids:
-            await self.account_manager.start_warmup_system()
+        # Cria os clientes de todas as contas em paralelo (retorna com o mínimo pronto)
+        await self._initialize_pool()
+
+        # O pré-aquecimento é iniciado pelo processo eleito líder (ver start_warmup_election)
         
         self._initialized = True
         logger.info(f"✅ InstagramService inicializado em {time.time() - start_time:.2f}s")
 
+    def start_warmup_election(self):
+        """
+        Disputa a liderança do pré-aquecimento (lifespan): só o líder da implantação
+        executa o AccountManager, evitando um loop por conta em cada worker.
+        """
+        self.warmup_leader.start(self.account_manager.start_warmup_system, self.account_manager.stop_warmup_system)
+
+    async def shutdown(self):
+        """Encerra as tarefas de fundo do serviço (lifespan)"""
+        await self.warmup_leader.stop()
+        await self.registry.stop()
+        await self.pool_initializer.stop()
+        # Aguarda as gravações pendentes: perdê-las obrigaria um novo login na próxima criação do cliente
+        if self._save_tasks:
+            await asyncio.gather(*self._save_tasks, return_exceptions=True)
+        # Por último: as tarefas acima ainda podem ter chamadas no pool de threads
+        self._executor.shutdown()
+
     async def ensure_initialized(self):
         """Garante que o serviço está inicializado"""
         if not self._initialized:
@@ -451,17 +790,23 @@ class InstagramService:
         # Carrega contas do .env primeiro
         await self._load_from_env()
         
-        # Pré-inicializa pelo menos um cliente
-        if self._account_ids:
-            try:
-                account_id = self._account_ids[0]
-                await self._initialize_client(account_id)
-                logger.info(f"✅ Cliente pré-inicializado para {account_id} em {time.time() - start_time:.2f}s")
-            except Exception as e:
-                logger.error(f"❌ Erro na pré-inicialização: {e}")
+        # Cria os clientes de todas as contas em paralelo (retorna com o mínimo pronto)
+        await self._initialize_pool()
+        logger.info(f"✅ Pool pré-inicializado em {time.time() - start_time:.2f}s")
         
         self._initialized = True
 
+    async def _initialize_pool(self):
+        """Cria em paralelo os clientes das contas que ainda não têm cliente (ver PoolInitializer)"""
+        pending = [account_id for account_id in self._account_ids if account_id not in self._clients]
+        if self._clients.max_size > 0:
+            # Acima do limite do pool os clientes seriam descartados logo em seguida
+            pending = pending[:max(self._clients.max_size - len(self._clients), 0)]
+        try:
+            await self.pool_initializer.start(pending, self._initialize_client)
+        except Exception as e:
+            logger.error(f"❌ Erro na inicialização do pool: {e}")
+
     async def _load_from_env(self):
         """Carrega contas do arquivo .env"""
         for key, value in os.environ.items():
@@ -488,21 +833,16 @@ class InstagramService:
             return None
         
         try:
-            client = Client(request_timeout=10)  # Reduzido de 15 para 10
-            device = random.choice(IPHONE_DEVICES)
-            client.set_device(device)
-            client.set_user_agent(device["user_agent"])
-            client.login_by_sessionid(session_id)
+            client = await self._create_client(account_id, session_id, 10)  # Reduzido de 15 para 10
             self._clients[account_id] = client
+            self.pool_initializer.mark(account_id, READY)
             logger.info(f"Cliente Instagrapi criado para a conta {account_id}")
             return client
         except Exception as e:
             logger.error(f"Erro ao inicializar cliente para conta {account_id}: {e}")
-            # Remove conta inválida
-            if account_id in self._session_ids:
-                del self._session_ids[account_id]
-            if account_id in self._account_ids:
-                self._account_ids.remove(account_id)
+            # Conta fica em quarentena e é testada novamente depois (não é removida do pool)
+            self.breaker.trip(account_id, e)
+            self.pool_initializer.mark(account_id, FAILED)
             return None
 
     async def _load_session_ids(self, db: AsyncSession):
@@ -545,9 +885,6 @@ class InstagramService:
             self._account_ids = list(self._session_ids.keys())
             logger.info(f"{len(self._session_ids)} contas do Instagram carregadas no total.")
             
-            # Inicia sistema de pré-aquecimento
-            await self.account_manager.start_warmup_system()
-            
         except Exception as e:
             logger.error(f"Erro ao carregar session IDs: {e}")
 
@@ -571,8 +908,9 @@ class InstagramService:
                         }
                         logger.info(f"Conta {account.username} carregada do banco de dados.")
                         
-                        # Inicia pré-aquecimento para nova conta
-                        await self.account_manager.start_account_warmup(account.username)
+                        # Inicia pré-aquecimento para nova conta (apenas no processo líder)
+                        if self.account_manager.is_running:
+                            self.account_manager.schedule_account(account.username)
                 except Exception as e:
                     logger.error(f"Erro ao carregar session_id para {account.username}: {e}")
 
@@ -583,96 +921,281 @@ class InstagramService:
         except Exception as e:
             logger.error(f"Erro ao carregar contas do banco de dados: {e}")
 
+    def _register_account(self, account_id: str, session_id: str, last_synced: Optional[datetime] = None) -> bool:
+        """Adiciona a conta ou troca sua sessão; retorna True se algo mudou"""
+        current = self._session_ids.get(account_id)
+        if current == session_id:
+            return False
+        if current is not None:
+            # Nova sessão: o cliente e o estado salvo da sessão anterior não servem mais
+            self._clients.pop(account_id, None)
+            self.client_settings.forget(account_id)
+            self.breaker.forget(account_id)
+        self._session_ids[account_id] = session_id
+        if account_id not in self._account_ids:
+            self._account_ids.append(account_id)
+        self.account_manager.accounts_status.setdefault(account_id, {
+            "username": account_id,
+            "last_synced": last_synced.isoformat() if last_synced else None,
+            "status": "loaded",
+            "last_warmup": None,
+            "last_activity": None
+        })
+        return True
+
+    async def _drop_account(self, account_id: str):
+        """Remove a conta do estado local deste worker"""
+        self.account_manager.unschedule_account(account_id)
+        self.account_manager.forget(account_id)
+        self._session_ids.pop(account_id, None)
+        self._clients.pop(account_id, None)
+        if account_id in self._account_ids:
+            self._account_ids.remove(account_id)
+        self._executor.forget(account_id)
+        self.scheduler.forget(account_id)
+        self.breaker.forget(account_id)
+        self.rate_limiter.forget(account_id)
+        self.hedging.forget(account_id)
+        self.client_settings.forget(account_id)
+        self.pool_initializer.forget(account_id)
+
+    async def _on_account_event(self, event: str, account_id: str):
+        """Aplica uma alteração feita por outro worker (ver AccountRegistry)"""
+        if event == ACCOUNT_REMOVED:
+            await self._drop_account(account_id)
+            logger.info(f"Conta {account_id} removida por outro worker.")
+            return
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(InstagramAccount).where(InstagramAccount.username == account_id))
+            account = result.scalar_one_or_none()
+        if account is None:
+            await self._drop_account(account_id)
+            return
+        if self._register_account(account_id, account.session_id, account.last_synced):
+            logger.info(f"Conta {account_id} {'adicionada' if event == ACCOUNT_ADDED else 'atualizada'} por outro worker.")
+            if self.account_manager.is_running:
+                self.account_manager.schedule_account(account_id)
+
+    async def _sync_accounts(self):
+        """Ressincronização completa com o banco (a cada conexão ao canal de eventos)"""
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(select(InstagramAccount))
+                accounts = result.scalars().all()
+        except Exception as e:
+            logger.error(f"Erro ao ressincronizar contas com o banco: {e}")
+            return
+
+        known = set()
+        for account in accounts:
+            try:
+                known.add(account.username)
+                if self._register_account(account.username, account.session_id, account.last_synced):
+                    if self.account_manager.is_running:
+                        self.account_manager.schedule_account(account.username)
+            except Exception as e:
+                logger.error(f"Erro ao carregar session_id para {account.username}: {e}")
+        # Contas removidas do banco enquanto este worker não recebia eventos (as do .env permanecem)
+        for account_id in list(self._account_ids):
+            if account_id not in known and not os.getenv(f"INSTAGRAM_SESSION_ID_{account_id}"):
+                await self._drop_account(account_id)
+
     async def _get_next_account_id(self) -> Optional[str]:
-        """Seleciona a próxima conta disponível (round-robin, thread-safe)."""
-        async with self._lock:
-            if not self._account_ids:
-                logger.error("Nenhuma conta Instagram configurada!")
-                return None
-            account_id = self._account_ids[self._account_index]
-            self._account_index = (self._account_index + 1) % len(self._account_ids)
-            return account_id
+        """Seleciona a conta mais saudável disponível (latência, erros e carga; ver AccountScheduler)."""
+        if not self._account_ids:
+            logger.error("Nenhuma conta Instagram configurada!")
+            return None
+        return self.scheduler.pick(self._available_accounts())
 
-    def _get_client(self) -> Optional[Client]:
+    async def _get_client(self, *kinds: str, exclude: Iterable[str] = ()) -> Tuple[Optional[str], Optional[Client]]:
         """
-        Obtém ou cria um cliente Instagrapi para a próxima conta disponível (Lazy Loading otimizado).
+        Obtém ou cria um cliente Instagrapi para a conta escolhida pelo scheduler (Lazy Loading otimizado).
+        kinds são os tipos de chamada que serão feitos (ver rate_limiter): contas sem orçamento são puladas.
+        Contas em exclude (já tentadas nesta requisição) não são escolhidas.
+        Retorna a tupla (account_id, client) para que as chamadas sejam feitas no executor da conta.
         """
-        # Se não há contas carregadas, tenta carregar do .env primeiro
+        # Contas do .env são carregadas na inicialização; as do banco chegam pelo AccountRegistry
         if not self._account_ids:
-            # Carrega do arquivo .env
-            for key, value in os.environ.items():
-                if key.startswith('INSTAGRAM_SESSION_ID_') and value:
-                    account_id = key.replace('INSTAGRAM_SESSION_ID_', '')
-                    if account_id not in self._session_ids:
-                        self._session_ids[account_id] = value
-                        self.account_manager.accounts_status[account_id] = {
-                            "username": account_id,
-                            "last_synced": datetime.utcnow().isoformat(),
-                            "status": "loaded",
-                            "last_warmup": None,
-                            "last_activity": None
-                        }
-                        logger.info(f"Conta {account_id} carregada do .env.")
-            
-            self._account_ids = list(self._session_ids.keys())
-            
-            if not self._account_ids:
-                logger.error("Nenhuma conta Instagram configurada!")
-                return None
-            
-            logger.info(f"{len(self._session_ids)} contas do Instagram carregadas do .env.")
-            
-        account_id = self._account_ids[self._account_index]
-        self._account_index = (self._account_index + 1) % len(self._account_ids)
+            logger.error("Nenhuma conta Instagram configurada!")
+            return None, None
 
-        # Se o cliente já existe no pool, retorna ele
-        if account_id in self._clients:
-            return self._clients[account_id]
+        excluded = set(exclude)
+        candidates = [account_id for account_id in self._available_accounts(kinds) if account_id not in excluded]
+        while candidates:
+            # Enquanto o pool inicializa, contas com cliente pronto têm preferência sobre a criação sob demanda
+            ready = [account_id for account_id in candidates if account_id in self._clients]
+            account_id = self.scheduler.pick(ready or candidates)
 
-        # Se não, cria um novo cliente (Lazy Loading)
-        session_id = self._session_ids.get(account_id)
-        if not session_id:
-            logger.error(f"Session ID não encontrado para a conta {account_id}")
-            return None
-        
+            # Se o cliente já existe no pool, retorna ele
+            if account_id in self._clients:
+                return account_id, self._clients[account_id]
+
+            # Se não, cria um novo cliente (Lazy Loading) sem bloquear o event loop
+            client = await self._initialize_client(account_id)
+            if client:
+                return account_id, client
+            candidates.remove(account_id)
+
+        logger.error("Nenhuma conta Instagram disponível (em quarentena ou sem orçamento)")
+        return None, None
+
+    async def _with_failover(
+        self, kinds: Tuple[str, ...], operation: Callable[[str, Client], Awaitable[Any]], hedge: bool = False
+    ) -> Any:
+        """
+        Executa operation(account_id, client) e, em falhas transitórias ou da conta (ver
+        retry_policy.is_retryable), repete em outra conta com backoff com jitter, até
+        RETRY_MAX_ATTEMPTS tentativas dentro de RETRY_DEADLINE segundos.
+        Com hedge=True, cada tentativa pode ser duplicada em uma segunda conta (ver _hedged).
+        Lança NoAccountAvailable se nenhuma conta puder ser usada.
+        """
+        deadline = time.monotonic() + RETRY_DEADLINE
+        tried: List[str] = []
+        last_error: Optional[Exception] = None
+        for attempt in range(1, RETRY_MAX_ATTEMPTS + 1):
+            account_id, client = await self._get_client(*kinds, exclude=tried)
+            if not client:
+                if last_error is not None:
+                    raise last_error
+                raise NoAccountAvailable()
+            try:
+                attempt_call = (
+                    self._hedged(kinds, account_id, client, operation, tried) if hedge
+                    else operation(account_id, client)
+                )
+                return await asyncio.wait_for(attempt_call, max(deadline - time.monotonic(), 0.1))
+            except Exception as e:
+                last_error = e
+                delay = backoff_delay(attempt)
+                if not is_retryable(e) or attempt == RETRY_MAX_ATTEMPTS or time.monotonic() + delay >= deadline:
+                    raise
+                tried.append(account_id)
+                logger.warning(f"🔁 {type(e).__name__} na conta {account_id}; nova tentativa em outra conta em {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _hedged(
+        self, kinds: Tuple[str, ...], account_id: str, client: Client,
+        operation: Callable[[str, Client], Awaitable[Any]], tried: List[str]
+    ) -> Any:
+        """
+        Executa operation na conta principal; se ela não responder dentro do percentil de
+        latência observado (HedgePolicy.delay) e houver orçamento, dispara a mesma operação
+        em uma segunda conta saudável e usa a primeira resposta bem-sucedida. A outra é
+        cancelada (a chamada já enviada ao Instagram termina no executor e é ignorada).
+        """
+        kind = kinds[0]
+        started = time.monotonic()
+        primary = asyncio.ensure_future(operation(account_id, client))
+        tasks = {primary: account_id}
         try:
-            client = Client(request_timeout=10)  # Reduzido de 15 para 10
-            device = random.choice(IPHONE_DEVICES)
-            client.set_device(device)
-            client.set_user_agent(device["user_agent"])
-            client.login_by_sessionid(session_id)
-            self._clients[account_id] = client
-            logger.info(f"Cliente Instagrapi criado para a conta {account_id}")
-            return client
-        except Exception as e:
-            logger.error(f"Erro ao inicializar cliente para conta {account_id}: {e}")
-            # Remove conta inválida
-            if account_id in self._session_ids:
-                del self._session_ids[account_id]
-            if account_id in self._account_ids:
-                self._account_ids.remove(account_id)
-            return None
+            delay = self.hedging.delay(account_id, kind) if self.hedging.enabled else None
+            self.hedging.on_primary()
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done and self.hedging.try_hedge():
+                    hedge_id, hedge_client = await self._get_client(*kinds, exclude=[*tried, account_id])
+                    if hedge_client and not primary.done():
+                        logger.info(f"🏁 Conta {account_id} lenta (> {delay:.2f}s): hedge na conta {hedge_id}")
+                        tasks[asyncio.ensure_future(operation(hedge_id, hedge_client))] = hedge_id
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    winner = tasks[task]
+                    self.hedging.record(winner, kind, time.monotonic() - started)
+                    if task is not primary:
+                        self.hedging.on_hedge_win()
+                    return task.result()
+            # Todas falharam: a conta secundária também conta como tentada
+            tried.extend(other for task, other in tasks.items() if task is not primary)
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
 
-    def _find_user_id(self, client: Client, username: str) -> Optional[int]:
+    async def _find_user_id(self, account_id: str, client: Client, username: str) -> Optional[int]:
         """
-        Busca o user_id de forma otimizada usando search_users.
-        Retorna None se não encontrar.
+        Busca o user_id de forma otimizada: primeiro no índice persistente e, só se
+        necessário, com search_users. Retorna None se não encontrar.
+        Falhas transitórias são propagadas para que a busca seja repetida em outra conta.
         """
+        user_id = await self.user_index.get(username)
+        if user_id is not None:
+            return user_id
+
         try:
-            # Busca usuários com o username específico
-            resultados = client.search_users(query=username)
-            
-            # Filtra pelo username exato (case-insensitive)
-            username_lower = username.lower()
-            for user in resultados:
-                if user.username.lower() == username_lower:
-                    return user.pk
-            
-            return None
+            user = await self._search_user(account_id, client, username)
+            return int(user.pk) if user else None
         except Exception as e:
             logger.error(f"Erro ao buscar user_id para {username}: {e}")
+            if is_retryable(e):
+                raise
             return None
 
+    @staticmethod
+    def _owned_by(owner: Optional[str], username: str) -> bool:
+        """O dono retornado pelo Instagram ainda é o username pedido (None = sem como verificar)"""
+        return owner is None or owner.lower() == username.strip().lstrip("@").lower()
+
+    async def _resolve_again(self, account_id: str, client: Client, username: str, user_id: int,
+                             reason: str) -> Optional[int]:
+        """
+        O user_id indexado não pertence mais ao username (perfil renomeado, nome reaproveitado
+        ou removido): descarta a resolução nas três camadas e busca o username de novo
+        """
+        logger.warning(f"🔄 Resolução {username} -> {user_id} desatualizada ({reason}). Buscando novamente.")
+        await self.user_index.forget(username)
+        user = await self._search_user(account_id, client, username)
+        return int(user.pk) if user else None
+
+    async def _verified_user_info(self, account_id: str, client: Client, username: str, user_id: int):
+        """user_info do user_id indexado, conferindo que ele ainda é do username pedido (None se não existe)"""
+        try:
+            user_info = await self._run(account_id, client.user_info, user_id)
+        except UserNotFound:
+            user_info = None
+        if user_info and self._owned_by(user_info.username, username):
+            return user_info
+
+        if user_info:
+            # O pk continua válido com o nome novo
+            await self.user_index.put(user_info.username, user_id)
+        reason = f"agora é @{user_info.username}" if user_info else "user_id não existe mais"
+        new_user_id = await self._resolve_again(account_id, client, username, user_id, reason)
+        if new_user_id is None or new_user_id == user_id:
+            return None
+        return await self._run(account_id, client.user_info, new_user_id)
+
+    async def _search_user(self, account_id: str, client: Client, username: str):
+        """
+        Executa search_users (uma chamada ao Instagram) e retorna o UserShort com o
+        username exato, ou None. Todos os resultados são colhidos para os índices.
+        """
+        # Busca usuários com o username específico
+        resultados = await self._run(account_id, client.search_users, query=username)
+
+        # Colhe todos os resultados (pk e privacidade) para futuras consultas sem busca
+        await self.user_index.harvest(resultados, username)
+        
+        # Filtra pelo username exato (case-insensitive)
+        username_lower = username.lower()
+        for user in resultados:
+            if user.username.lower() == username_lower:
+                return user
+        return None
+
+    async def _privacy_result(self, is_private: bool, tier: str) -> dict:
+        """Monta a resposta de privacidade registrando qual camada respondeu"""
+        await self.user_index.record_privacy_tier(tier)
+        return {"status": "success", "privacy": "private" if is_private else "public", "source": tier}
+
     @redis_cache(ttl=300)  # Cache de 5 minutos
     async def get_user_stories(self, username: str, db: AsyncSession = None) -> dict:
         """Obtém os stories de um usuário."""
@@ -683,18 +1206,21 @@ class InstagramService:
         if not self._account_ids and db:
             await self._update_accounts_from_db(db)
             
-        client = self._get_client()
-        if not client:
-            return {"status": "error", "message": "No available Instagram accounts"}
-        try:
+        async def fetch(account_id: str, client: Client) -> dict:
             # Busca o user_id de forma otimizada
-            user_id = self._find_user_id(client, username)
+            user_id = await self._find_user_id(account_id, client, username)
             if user_id is None:
                 return {"status": "error", "message": "User not found"}
             
             # Tenta obter os stories com tratamento de erro específico
             try:
-                stories = client.user_stories(user_id)
+                stories = await self._run(account_id, client.user_stories, user_id)
+                owner = getattr(getattr(stories[0], "user", None), "username", None) if stories else None
+                if not self._owned_by(owner, username):
+                    user_id = await self._resolve_again(account_id, client, username, user_id, f"agora é @{owner}")
+                    if user_id is None:
+                        return {"status": "error", "message": "User not found"}
+                    stories = await self._run(account_id, client.user_stories, user_id)
                 
                 stories_data = []
                 for story in stories:
@@ -713,174 +1239,364 @@ class InstagramService:
                     return {"status": "error", "message": "Failed to retrieve stories - API response error"}
                 else:
                     raise e
-                    
+
+        try:
+            return await self._with_failover(("stories",), fetch)
+        except NoAccountAvailable:
+            return {"status": "error", "message": "No available Instagram accounts"}
         except Exception as e:
             logger.error(f"Erro ao buscar stories de {username}: {e}")
             return {"status": "error", "message": f"Failed to retrieve stories for {username}"}
 
-    @redis_cache(ttl=120)  # Cache de 2 minutos
+    @redis_cache(ttl=120, response_model=PrivacyResponse)  # Cache de 2 minutos
     async def get_profile_privacy(self, username: str, db: AsyncSession = None) -> dict:
+        """
+        Verifica a privacidade com no máximo uma chamada ao Instagram, nesta ordem:
+        índice de privacidade (colhido das buscas) -> perfil já cacheado ->
+        search_users (se o user_id não é conhecido) ou user_info (se é).
+        O campo source indica a camada que respondeu.
+        """
         # Garante que o serviço está inicializado
         await self.ensure_initialized()
+
+        # 1 e 2. Privacidade colhida de um search_users recente ou perfil já cacheado (sem chamada)
+        privacy = await self._privacy_without_upstream(username, None)
+        if privacy is not None:
+            return privacy
         
         # Se não há contas carregadas e temos acesso ao banco, tenta carregar
         if not self._account_ids and db:
             await self._update_accounts_from_db(db)
             
-        client = self._get_client()
-        if not client:
-            return {"status": "error", "message": "No available Instagram accounts"}
-        try:
-            # Busca o user_id de forma otimizada
-            user_id = self._find_user_id(client, username)
+        async def fetch(account_id: str, client: Client) -> dict:
+            # 3. Uma única chamada: search_users já traz is_private quando o user_id é desconhecido
+            user_id = await self.user_index.get(username)
             if user_id is None:
-                return {"status": "error", "message": "User not found"}
+                user = await self._search_user(account_id, client, username)
+                if user is None:
+                    return {"status": "error", "message": "User not found"}
+                if user.is_private is not None:
+                    return await self._privacy_result(user.is_private, "search")
+                user_id = user.pk
             
             # Obtém as informações usando o user_id
-            user_info = client.user_info(user_id)
+            user_info = await self._verified_user_info(account_id, client, username, user_id)
             if not user_info:
                 return {"status": "error", "message": "User not found"}
                 
-            privacy = "private" if user_info.is_private else "public"
-            return {"status": "success", "privacy": privacy, "source": "instagrapi"}
+            return await self._privacy_result(user_info.is_private, "user_info")
+
+        try:
+            return await self._with_failover(("user_info",), fetch, hedge=True)
+        except NoAccountAvailable:
+            return {"status": "error", "message": "No available Instagram accounts"}
         except Exception as e:
             logger.error(f"Erro ao verificar perfil {username} com Instagrapi: {e}")
             if "not found" in str(e).lower() or "does not exist" in str(e).lower():
                 return {"status": "error", "message": "User not found"}
             return {"status": "error", "message": "Failed to retrieve profile privacy"}
 
-    @redis_cache(ttl=1800)  # Cache de 30 minutos
+    async def _fetch_user_medias(self, account_id: str, client: Client, user_id: int, amount: int) -> list:
+        """Busca as últimas mídias do usuário, com fallback para a API v1 quando a resposta vem sem 'data'"""
+        try:
+            return await self._run(account_id, client.user_medias, user_id, amount=amount)
+        except KeyError as e:
+            if 'data' not in str(e):
+                raise
+            logger.warning(f"Instagram API retornou resposta inesperada para mídias de {user_id}. Tentando método alternativo.")
+            try:
+                return await self._run(account_id, client.user_medias_v1, user_id, amount=amount)
+            except Exception as e2:
+                raise MediaFetchError(str(e2)) from e2
+
+    async def _get_owned_timeline(self, account_id: str, client: Client, username: str, user_id: int,
+                                  amount: int) -> Optional[dict]:
+        """Linha do tempo do user_id indexado, conferindo o dono das mídias (None se o username não existe mais)"""
+        timeline = await self._get_media_timeline(account_id, client, user_id, amount)
+        if self._owned_by(timeline.get("owner"), username):
+            return timeline
+        user_id = await self._resolve_again(account_id, client, username, user_id, f"agora é @{timeline['owner']}")
+        if user_id is None:
+            return None
+        return await self._get_media_timeline(account_id, client, user_id, amount)
+
+    async def _get_media_timeline(self, account_id: str, client: Client, user_id: int, amount: int) -> dict:
+        """
+        Linha do tempo compartilhada por posts e reels; só vai ao Instagram se a janela em cache
+        não basta ou, ao atualizar o cache de posts/reels, se ela for mais antiga que
+        MEDIA_TIMELINE_REFRESH_MAX_AGE (as idades dos dois caches não se somam)
+        """
+        return await self.media_timeline.get_or_fetch(
+            user_id, amount,
+            lambda window: self._fetch_user_medias(account_id, client, user_id, window),
+            max_age=MEDIA_TIMELINE_REFRESH_MAX_AGE if is_cache_refresh() else None
+        )
+
+    @redis_cache(ttl=1800, response_model=PostsResponse)  # Cache de 30 minutos
     async def get_last_posts(self, username: str, count: int = 4, db: AsyncSession = None) -> dict:
         # Se não há contas carregadas e temos acesso ao banco, tenta carregar
         if not self._account_ids and db:
             await self._update_accounts_from_db(db)
             
-        client = self._get_client()
-        if not client:
-            return {"status": "error", "message": "No available Instagram accounts"}
-        try:
+        async def fetch(account_id: str, client: Client) -> dict:
             # Busca o user_id de forma otimizada
-            user_id = self._find_user_id(client, username)
+            user_id = await self._find_user_id(account_id, client, username)
             if user_id is None:
                 return {"status": "error", "message": "User not found"}
             
-            # Tenta obter as mídias com tratamento de erro específico
-            try:
-                medias = client.user_medias(user_id, amount=count)
-                post_codes = [media.code for media in medias]
-                return {"status": "success", "posts": post_codes, "source": "instagrapi"}
-            except KeyError as e:
-                if 'data' in str(e):
-                    logger.warning(f"Instagram API retornou resposta inesperada para posts de {username}. Tentando método alternativo.")
-                    # Tenta método alternativo
-                    try:
-                        medias = client.user_medias_v1(user_id, amount=count)
-                        post_codes = [media.code for media in medias]
-                        return {"status": "success", "posts": post_codes, "source": "instagrapi"}
-                    except Exception as e2:
-                        logger.error(f"Erro no método alternativo para posts de {username}: {e2}")
-                        return {"status": "error", "message": "Failed to retrieve posts - API response error"}
-                else:
-                    raise e
-                    
+            timeline = await self._get_owned_timeline(account_id, client, username, user_id, count)
+            if timeline is None:
+                return {"status": "error", "message": "User not found"}
+            return {"status": "success", "posts": timeline_posts(timeline, count), "source": "instagrapi"}
+
+        try:
+            return await self._with_failover(("medias",), fetch)
+        except NoAccountAvailable:
+            return {"status": "error", "message": "No available Instagram accounts"}
+        except MediaFetchError as e:
+            logger.error(f"Erro no método alternativo para posts de {username}: {e}")
+            return {"status": "error", "message": "Failed to retrieve posts - API response error"}
         except Exception as e:
             logger.error(f"Erro ao buscar posts de {username} com Instagrapi: {e}")
             return {"status": "error", "message": "Failed to retrieve posts"}
 
-    @redis_cache(ttl=1800)  # Cache de 30 minutos
+    @redis_cache(ttl=1800, response_model=ReelsResponse)  # Cache de 30 minutos
     async def get_last_reels(self, username: str, count: int = 4, db: AsyncSession = None) -> dict:
         # Se não há contas carregadas e temos acesso ao banco, tenta carregar
         if not self._account_ids and db:
             await self._update_accounts_from_db(db)
             
-        client = self._get_client()
-        if not client:
-            return {"status": "error", "message": "No available Instagram accounts"}
-        try:
+        async def fetch(account_id: str, client: Client) -> dict:
             # Busca o user_id de forma otimizada
-            user_id = self._find_user_id(client, username)
+            user_id = await self._find_user_id(account_id, client, username)
             if user_id is None:
                 return {"status": "error", "message": "User not found"}
             
-            # Tenta obter as mídias com tratamento de erro específico
-            try:
-                medias = client.user_medias(user_id, amount=20)
-                reel_codes = [m.code for m in medias if m.product_type == "clips"][:count]
-                return {"status": "success", "reels": reel_codes, "source": "instagrapi"}
-            except KeyError as e:
-                if 'data' in str(e):
-                    logger.warning(f"Instagram API retornou resposta inesperada para reels de {username}. Tentando método alternativo.")
-                    # Tenta método alternativo
-                    try:
-                        medias = client.user_medias_v1(user_id, amount=20)
-                        reel_codes = [m.code for m in medias if hasattr(m, 'product_type') and m.product_type == "clips"][:count]
-                        return {"status": "success", "reels": reel_codes, "source": "instagrapi"}
-                    except Exception as e2:
-                        logger.error(f"Erro no método alternativo para reels de {username}: {e2}")
-                        return {"status": "error", "message": "Failed to retrieve reels - API response error"}
-                else:
-                    raise e
-                    
+            # Reels são filtrados da janela mínima da linha do tempo (20 mídias)
+            timeline = await self._get_owned_timeline(account_id, client, username, user_id, MEDIA_TIMELINE_MIN_WINDOW)
+            if timeline is None:
+                return {"status": "error", "message": "User not found"}
+            return {"status": "success", "reels": timeline_reels(timeline, count), "source": "instagrapi"}
+
+        try:
+            return await self._with_failover(("medias",), fetch)
+        except NoAccountAvailable:
+            return {"status": "error", "message": "No available Instagram accounts"}
+        except MediaFetchError as e:
+            logger.error(f"Erro no método alternativo para reels de {username}: {e}")
+            return {"status": "error", "message": "Failed to retrieve reels - API response error"}
         except Exception as e:
             logger.error(f"Erro ao buscar reels de {username} com Instagrapi: {e}")
             return {"status": "error", "message": "Failed to retrieve reels"}
 
-    @redis_cache(ttl=1800)  # Cache de 30 minutos
+    def _profile_result(self, user_info) -> dict:
+        """Monta a resposta de perfil a partir do user_info do instagrapi"""
+        data = {
+            "username": user_info.username,
+            "full_name": user_info.full_name,
+            "biography": user_info.biography,
+            "followers_count": user_info.follower_count,
+            "following_count": user_info.following_count,
+            "media_count": user_info.media_count,
+            "is_private": user_info.is_private,
+            "is_verified": user_info.is_verified,
+            "is_business": user_info.is_business,
+            "category": user_info.category_name,
+            "profile_pic_url": str(user_info.profile_pic_url),
+            "profile_pic_hd": str(user_info.profile_pic_url_hd),
+            "external_url": str(user_info.external_url),
+            "created_at": None,
+            "last_updated": None
+        }
+        # Enriquecimento feito uma única vez, na escrita do cache
+        if data.get("profile_pic_url"):
+            data["profile_pic_proxy_url"] = f"{PROXY_IMAGE_BASE_URL}?url={quote(data['profile_pic_url'])}"
+        return {"status": "success", "success": True, "data": data}
+
+    @redis_cache(ttl=1800, response_model=ProfileResponse)  # Cache de 30 minutos
     async def get_profile_info(self, username: str, db: AsyncSession = None) -> dict:
         # Se não há contas carregadas e temos acesso ao banco, tenta carregar
         if not self._account_ids and db:
             await self._update_accounts_from_db(db)
             
-        client = self._get_client()
-        if not client:
-            return {"status": "error", "message": "No available Instagram accounts"}
-        try:
+        async def fetch(account_id: str, client: Client) -> dict:
             # Busca o user_id de forma otimizada
-            user_id = self._find_user_id(client, username)
+            user_id = await self._find_user_id(account_id, client, username)
             if user_id is None:
                 return {"status": "error", "message": "User not found"}
             
             # Obtém as informações completas usando o user_id
-            user_info = client.user_info(user_id)
+            user_info = await self._verified_user_info(account_id, client, username, user_id)
             if not user_info:
                 return {"status": "error", "message": "User not found"}
                 
-            data = {
-                "username": user_info.username,
-                "full_name": user_info.full_name,
-                "biography": user_info.biography,
-                "followers_count": user_info.follower_count,
-                "following_count": user_info.following_count,
-                "media_count": user_info.media_count,
-                "is_private": user_info.is_private,
-                "is_verified": user_info.is_verified,
-                "is_business": user_info.is_business,
-                "category": user_info.category_name,
-                "profile_pic_url": str(user_info.profile_pic_url),
-                "profile_pic_hd": str(user_info.profile_pic_url_hd),
-                "external_url": str(user_info.external_url),
-                "created_at": None,
-                "last_updated": None
-            }
-            return {"status": "success", "data": data}
+            return self._profile_result(user_info)
+
+        try:
+            return await self._with_failover(("user_info",), fetch, hedge=True)
+        except NoAccountAvailable:
+            return {"status": "error", "message": "No available Instagram accounts"}
         except Exception as e:
             logger.error(f"Erro ao buscar informações do perfil {username} com Instagrapi: {e}")
             if "not found" in str(e).lower() or "does not exist" in str(e).lower():
                 return {"status": "error", "message": "User not found"}
             return {"status": "error", "message": "Failed to retrieve profile information"}
 
+    async def get_profile_bundle(self, username: str, parts: List[str], count: int = 4, db: AsyncSession = None) -> dict:
+        """
+        Perfil, privacidade, posts e reels em uma única requisição.
+
+        Partes já cacheadas são servidas do cache dos endpoints individuais. Para o restante,
+        o usuário é resolvido uma vez e user_info e a linha do tempo de mídias são buscados
+        em paralelo (no máximo duas chamadas ao Instagram, mais search_users se o user_id
+        não estiver indexado). Os resultados preenchem o cache de cada endpoint individual.
+        """
+        await self.ensure_initialized()
+
+        calls = {
+            "profile": (self.get_profile_info, (username,)),
+            "privacy": (self.get_profile_privacy, (username,)),
+            "posts": (self.get_last_posts, (username, count)),
+            "reels": (self.get_last_reels, (username, count)),
+        }
+        parts = [part for part in BUNDLE_PARTS if part in parts]
+        bundle = {"status": "success", "username": username, "cached": []}
+
+        # 1. Partes já cacheadas (L1/Redis), consultadas em paralelo
+        cached = await asyncio.gather(*(peek_cached(calls[part][0], *calls[part][1]) for part in parts))
+        missing = []
+        for part, result in zip(parts, cached):
+            if result is not None:
+                bundle[part] = result
+                bundle["cached"].append(part)
+            else:
+                missing.append(part)
+        if not missing:
+            return bundle
+
+        # 2. Privacidade sem chamada: índice de privacidade ou perfil cacheado
+        if "privacy" in missing:
+            privacy = await self._privacy_without_upstream(username, bundle.get("profile"))
+            if privacy is not None:
+                bundle["privacy"] = privacy
+                missing.remove("privacy")
+                await prime_cached(self.get_profile_privacy, privacy, username)
+            if not missing:
+                return bundle
+
+        # Se não há contas carregadas e temos acesso ao banco, tenta carregar
+        if not self._account_ids and db:
+            await self._update_accounts_from_db(db)
+
+        # 3. Resolução única do user_id (um search_users colhe também a privacidade)
+        try:
+            user_id = await self._with_failover(
+                ("search",), lambda account_id, client: self._find_user_id(account_id, client, username)
+            )
+        except NoAccountAvailable:
+            return {"status": "error", "message": "No available Instagram accounts"}
+        except Exception as e:
+            logger.error(f"Erro ao buscar user_id para {username}: {e}")
+            return {"status": "error", "message": "Failed to retrieve profile"}
+        if user_id is None:
+            return {"status": "error", "message": "User not found"}
+
+        if "privacy" in missing and "profile" not in missing:
+            privacy = await self._privacy_without_upstream(username, None)
+            if privacy is not None:
+                bundle["privacy"] = privacy
+                missing.remove("privacy")
+                await prime_cached(self.get_profile_privacy, privacy, username)
+
+        # 4. user_info e linha do tempo em paralelo (cada um com failover próprio entre as contas)
+        need_info = "profile" in missing or "privacy" in missing
+        need_timeline = "posts" in missing or "reels" in missing
+        window = max(count if "posts" in missing else 0, MEDIA_TIMELINE_MIN_WINDOW if "reels" in missing else 0)
+        info_result, timeline_result = await asyncio.gather(
+            self._with_failover(
+                ("user_info",),
+                lambda account_id, client: self._verified_user_info(account_id, client, username, user_id), hedge=True
+            ) if need_info else asyncio.sleep(0),
+            self._with_failover(
+                ("medias",),
+                lambda account_id, client: self._get_owned_timeline(account_id, client, username, user_id, window)
+            ) if need_timeline else asyncio.sleep(0),
+            return_exceptions=True
+        )
+
+        if need_info:
+            if isinstance(info_result, Exception) or not info_result:
+                logger.error(f"Erro ao buscar informações do perfil {username} com Instagrapi: {info_result}")
+                not_found = not info_result or "not found" in str(info_result).lower() or "does not exist" in str(info_result).lower()
+                if "profile" in missing:
+                    bundle["profile"] = {"status": "error", "message": "User not found" if not_found else "Failed to retrieve profile information"}
+                if "privacy" in missing:
+                    bundle["privacy"] = {"status": "error", "message": "User not found" if not_found else "Failed to retrieve profile privacy"}
+            else:
+                if "profile" in missing:
+                    bundle["profile"] = self._profile_result(info_result)
+                    await prime_cached(self.get_profile_info, bundle["profile"], username)
+                if "privacy" in missing:
+                    bundle["privacy"] = await self._privacy_result(info_result.is_private, "user_info")
+                    await prime_cached(self.get_profile_privacy, bundle["privacy"], username)
+
+        if need_timeline:
+            if isinstance(timeline_result, Exception):
+                logger.error(f"Erro ao buscar mídias de {username} com Instagrapi: {timeline_result}")
+                suffix = " - API response error" if isinstance(timeline_result, MediaFetchError) else ""
+                for part in ("posts", "reels"):
+                    if part in missing:
+                        bundle[part] = {"status": "error", "message": f"Failed to retrieve {part}{suffix}"}
+            elif timeline_result is None:
+                for part in ("posts", "reels"):
+                    if part in missing:
+                        bundle[part] = {"status": "error", "message": "User not found"}
+            else:
+                if "posts" in missing:
+                    bundle["posts"] = {"status": "success", "posts": timeline_posts(timeline_result, count), "source": "instagrapi"}
+                    await prime_cached(self.get_last_posts, bundle["posts"], username, count)
+                if "reels" in missing:
+                    bundle["reels"] = {"status": "success", "reels": timeline_reels(timeline_result, count), "source": "instagrapi"}
+                    await prime_cached(self.get_last_reels, bundle["reels"], username, count)
+
+        return bundle
+
+    async def prepare_batch(self, db: AsyncSession = None):
+        """Garante serviço e contas carregados antes de uma consulta em lote (que não usa a sessão db)"""
+        await self.ensure_initialized()
+        if not self._account_ids and db:
+            await self._update_accounts_from_db(db)
+
+    async def batch_lookup(self, usernames: List[str], fields: List[str], count: int = 4, db: AsyncSession = None) -> dict:
+        """Consulta vários usernames: cache lido em lote e misses distribuídos entre as contas"""
+        await self.prepare_batch(db)
+        return await collect_batch(self, usernames, fields, count)
+
+    def stream_batch(self, usernames: List[str], fields: List[str], count: int = 4) -> AsyncIterator[dict]:
+        """Versão em streaming de batch_lookup: gera cada resultado assim que fica pronto (chame prepare_batch antes)"""
+        return lookup_batch(self, usernames, fields, count)
+
+    async def _privacy_without_upstream(self, username: str, profile: Optional[dict]) -> Optional[dict]:
+        """Privacidade a partir do índice ou do perfil cacheado, sem chamada ao Instagram (None se indisponível)"""
+        is_private = await self.user_index.get_privacy(username)
+        if is_private is not None:
+            return await self._privacy_result(is_private, "privacy_index")
+        if profile is None:
+            profile = await peek_cached(self.get_profile_info, username)
+        if profile and (profile.get("data") or {}).get("is_private") is not None:
+            return await self._privacy_result(profile["data"]["is_private"], "profile_cache")
+        return None
+
     async def login_and_save_account_by_session(self, session_id: str, db: AsyncSession) -> dict:
-        client = Client(request_timeout=15)
-        device = random.choice(IPHONE_DEVICES)
-        client.set_device(device)
-        client.set_user_agent(device["user_agent"])
         try:
-            client.login_by_sessionid(session_id)
+            # Login e user_info são bloqueantes: rodam no executor (conta ainda desconhecida, sem lock)
+            client = await self._run(None, _build_client, session_id, 15)
             user_id = client.user_id
-            user_info = client.user_info(user_id)
+            user_info = await self._run(None, client.user_info, user_id)
             username = user_info.username
             if not user_info:
                 return {"status": "error", "message": "Failed to retrieve user info after login with session_id."}
+            await self.user_index.put(username, user_info.pk)
             
             # Verifica se a conta já existe
             result = await db.execute(select(InstagramAccount).where(InstagramAccount.username == username))
@@ -894,14 +1610,15 @@ class InstagramService:
             account.last_synced = datetime.utcnow()
             await db.commit()
             await db.refresh(account)
+            await self.client_settings.save(username, session_id, client.get_settings())
+            event = ACCOUNT_REFRESHED if username in self._session_ids else ACCOUNT_ADDED
             
             logger.info(f"Conta {username} logada com session_id e salva/atualizada no banco de dados.")
 
-            # Atualiza cache local
-            self._session_ids[username] = session_id
+            # Atualiza cache local e avisa os outros workers
+            self._register_account(username, session_id, account.last_synced)
             self._clients[username] = client
-            if username not in self._account_ids:
-                self._account_ids.append(username)
+            await self.registry.publish(event, username)
 
             return {"status": "success", "message": "Login with session_id successful and account saved.", "username": username}
         except Exception as e:
@@ -919,13 +1636,11 @@ class InstagramService:
             await db.delete(account_to_delete)
             await db.commit()
 
-            # Remove do cache local
-            if username in self._session_ids:
-                del self._session_ids[username]
-            if username in self._clients:
-                del self._clients[username]
-            if username in self._account_ids:
-                self._account_ids.remove(username)
+            # Remove do cache local e avisa os outros workers
+            await self.client_settings.invalidate(username)
+            await self._drop_account(username)
+            await self.registry.publish(ACCOUNT_REMOVED, username)
+            # O cache não é por conta (as chaves levam o username consultado): nada a invalidar
             
             logger.info(f"Conta {username} deletada do sistema.")
             return True
@@ -952,10 +1667,61 @@ class InstagramService:
             logger.error(f"Erro ao listar contas: {e}")
             return []
 
+    async def preload_user_index(self, usernames: List[str], concurrency: int = 5) -> dict:
+        """
+        Pré-carrega o índice username -> user_id para uma lista de usernames.
+        Usernames já indexados não geram chamadas ao Instagram; os demais são resolvidos
+        com concorrência limitada.
+        """
+        await self.ensure_initialized()
+        usernames = list(dict.fromkeys(u.strip().lstrip("@").lower() for u in usernames if u and u.strip()))
+        missing = [u for u in usernames if await self.user_index.get(u) is None]
+
+        semaphore = asyncio.Semaphore(concurrency)
+        not_found: List[str] = []
+
+        async def resolve(username: str):
+            async with semaphore:
+                try:
+                    user_id = await self._with_failover(
+                        ("search",), lambda account_id, client: self._find_user_id(account_id, client, username)
+                    )
+                except Exception as e:
+                    logger.error(f"Erro ao indexar {username}: {e}")
+                    user_id = None
+                if user_id is None:
+                    not_found.append(username)
+
+        await asyncio.gather(*(resolve(u) for u in missing))
+        await self.user_index.flush()
+        return {
+            "status": "success",
+            "requested": len(usernames),
+            "already_indexed": len(usernames) - len(missing),
+            "resolved": len(missing) - len(not_found),
+            "not_found": not_found,
+        }
+
+    async def get_user_index_stats(self) -> Dict:
+        """Retorna estatísticas do índice username -> user_id"""
+        return {"status": "success", "index": await self.user_index.get_stats()}
+
     # Métodos de gerenciamento de contas
     async def get_accounts_status(self) -> Dict:
         """Retorna status detalhado de todas as contas"""
-        return self.account_manager.get_all_accounts_status()
+        status = self.account_manager.get_all_accounts_status()
+        status["executor"] = self._executor.get_stats()
+        status["client_pool"] = self._clients.get_stats()
+        status["client_settings"] = self.client_settings.get_stats()
+        status["pool"] = self.pool_initializer.get_stats()
+        status["registry"] = self.registry.get_stats()
+        status["warmup_leader"] = await self.warmup_leader.get_stats()
+        status["scheduler"] = self.scheduler.get_stats()
+        status["circuits"] = self.breaker.get_stats()
+        status["rate_limits"] = self.rate_limiter.get_stats()
+        status["hedging"] = self.hedging.get_stats()
+        status["media_timeline"] = self.media_timeline.get_stats()
+        return status
     
     async def get_account_status(self, username: str) -> Dict:
         """Retorna status detalhado de uma conta específica"""
@@ -969,9 +1735,21 @@ class InstagramService:
         """Para pré-aquecimento de uma conta específica"""
         await self.account_manager.stop_account_warmup(username)
     
+    async def pause_account_warmup(self, username: str):
+        """Pausa o pré-aquecimento de uma conta específica"""
+        await self.account_manager.pause_account_warmup(username)
+    
+    async def resume_account_warmup(self, username: str):
+        """Retoma o pré-aquecimento de uma conta específica"""
+        await self.account_manager.resume_account_warmup(username)
+    
+    async def start_warmup_system(self):
+        """Reabilita o sistema de pré-aquecimento (em toda a implantação)"""
+        await self.account_manager.enable_warmup_system()
+    
     async def stop_warmup_system(self):
-        """Para o sistema de pré-aquecimento"""
-        await self.account_manager.stop_warmup_system()
+        """Para o sistema de pré-aquecimento (em toda a implantação)"""
+        await self.account_manager.disable_warmup_system()
     
     async def get_warmup_logs(self, limit: int = 100) -> List[Dict]:
         """Retorna logs detalhados do sistema de pré-aquecimento"""
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from services.redis_cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Workers de jobs por processo da API
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Usernames por item de trabalho (cada item é consultado com lookup_batch)
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", 25))
+# Validade (segundos) de um job e de seus resultados após a última atividade
+JOB_TTL = int(os.getenv("JOB_TTL", 86400))
+# Intervalo de consulta da fila quando está vazia
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+# Falhas de um item antes de ele ser gravado como erro (em vez de voltar à fila)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# Um consumidor sem heartbeat por este tempo é considerado morto e seus itens voltam à fila
+JOB_HEARTBEAT_TTL = int(os.getenv("JOB_HEARTBEAT_TTL", 30))
+
+JOBS_QUEUE_KEY = "jobs:queue"
+JOBS_PROCESSING_PREFIX = "jobs:processing:"
+JOBS_HEARTBEAT_PREFIX = "jobs:heartbeat:"
+
+# Marca o job como em execução apenas se ele ainda existe e está na fila
+_START_JOB_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'state') == 'queued' then
+    redis.call('HSET', KEYS[1], 'state', 'running', 'started_at', ARGV[1])
+end
+return 1
+"""
+
+# Grava os resultados de um item e atualiza o progresso de forma atômica,
+# apenas se o job ainda estiver em execução (não cancelado/removido). A entrega é
+# at-least-once: um item reentregue cujo offset já foi gravado não é contado de novo
+_COMMIT_CHUNK_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'state') ~= 'running' then
+    return -1
+end
+if redis.call('SADD', KEYS[4], ARGV[7]) == 0 then
+    return tonumber(redis.call('HGET', KEYS[1], 'done'))
+end
+for i = 8, #ARGV do
+    redis.call('RPUSH', KEYS[2], ARGV[i])
+end
+redis.call('HINCRBY', KEYS[1], 'success', ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'partial', ARGV[3])
+redis.call('HINCRBY', KEYS[1], 'error', ARGV[4])
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[5])
+local done = redis.call('HINCRBY', KEYS[1], 'done', ARGV[1])
+if done >= tonumber(redis.call('HGET', KEYS[1], 'total')) then
+    redis.call('HSET', KEYS[1], 'state', 'completed', 'finished_at', ARGV[5])
+end
+for i = 1, #KEYS do
+    redis.call('EXPIRE', KEYS[i], ARGV[6])
+end
+return done
+"""
+
+# Tira da lista de processamento exatamente o item que falhou e conta a tentativa no
+# hash do job; devolve à fila enquanto houver tentativas. Retorna o número de tentativas
+# (0 se o job não existe mais: o item é descartado)
+_FAIL_ITEM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('LREM', KEYS[2], 1, ARGV[1])
+    return 0
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts:' .. ARGV[2], 1)
+if attempts < tonumber(ARGV[3]) then
+    redis.call('LREM', KEYS[2], 1, ARGV[1])
+    redis.call('LPUSH', KEYS[3], ARGV[1])
+end
+return attempts
+"""
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _usernames_key(job_id: str) -> str:
+    return f"job:{job_id}:usernames"
+
+
+def _results_key(job_id: str) -> str:
+    return f"job:{job_id}:results"
+
+
+def _committed_key(job_id: str) -> str:
+    """Offsets dos itens já gravados (commit idempotente)"""
+    return f"job:{job_id}:committed"
+
+
+class JobQueue:
+    """
+    Jobs de consulta em lote processados em segundo plano pelos próprios processos da API.
+
+    Cada job guarda seus usernames e resultados no Redis e é dividido em itens de
+    JOB_CHUNK_SIZE usernames na fila jobs:queue. Os workers movem o item para a lista
+    de processamento do seu consumidor (LMOVE) e só o removem depois de gravar os
+    resultados; se um processo morre, seu heartbeat expira e os itens voltam à fila,
+    então os jobs continuam após um restart.
+    """
+
+    def __init__(self):
+        # Definidos em start(): com preload_app a instância é criada antes do fork e
+        # um id calculado aqui seria o mesmo em todos os workers
+        self.consumer_id: Optional[str] = None
+        self._processing_key: Optional[str] = None
+        self._heartbeat_key: Optional[str] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def submit(self, usernames: List[str], fields: List[str], count: int = 4) -> dict:
+        redis_conn = await get_redis()
+        if redis_conn is None:
+            return {"status": "error", "message": "Job queue unavailable (Redis not connected)"}
+
+        unique = list(dict.fromkeys(username.strip() for username in usernames if username.strip()))
+        if not unique:
+            return {"status": "error", "message": "No valid usernames"}
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        pipe = redis_conn.pipeline(transaction=True)
+        for start in range(0, len(unique), 1000):
+            pipe.rpush(_usernames_key(job_id), *unique[start:start + 1000])
+        pipe.hset(_job_key(job_id), mapping={
+            "state": "queued", "total": len(unique), "done": 0, "success": 0, "partial": 0, "error": 0,
+            "fields": ",".join(fields), "count": count, "created_at": now, "updated_at": now,
+        })
+        pipe.expire(_usernames_key(job_id), JOB_TTL)
+        pipe.expire(_job_key(job_id), JOB_TTL)
+        pipe.lpush(JOBS_QUEUE_KEY, *[f"{job_id}:{offset}" for offset in range(0, len(unique), JOB_CHUNK_SIZE)])
+        await pipe.execute()
+
+        logger.info(f"📦 Job {job_id} criado com {len(unique)} usernames")
+        return {"status": "success", "job_id": job_id, "total": len(unique)}
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        redis_conn = await get_redis()
+        if redis_conn is None:
+            return None
+        job = await redis_conn.hgetall(_job_key(job_id))
+        if not job:
+            return None
+
+        total, done = int(job["total"]), int(job["done"])
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "state": job["state"],
+            "fields": job["fields"].split(","),
+            "total": total,
+            "done": done,
+            "progress": round(done / total, 4) if total else 1.0,
+            "success": int(job["success"]),
+            "partial": int(job["partial"]),
+            "error": int(job["error"]),
+            "created_at": float(job["created_at"]),
+            "updated_at": float(job["updated_at"]),
+            "finished_at": float(job["finished_at"]) if job.get("finished_at") else None,
+        }
+
+    async def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> Optional[dict]:
+        redis_conn = await get_redis()
+        if redis_conn is None or not await redis_conn.exists(_job_key(job_id)):
+            return None
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.llen(_results_key(job_id))
+        pipe.lrange(_results_key(job_id), offset, offset + limit - 1)
+        total_results, results = await pipe.execute()
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "offset": offset,
+            "limit": limit,
+            "total_results": total_results,
+            "results": [json.loads(result) for result in results],
+        }
+
+    async def delete_job(self, job_id: str) -> bool:
+        """Cancela o job e remove seus dados; itens já na fila são descartados pelos workers"""
+        redis_conn = await get_redis()
+        if redis_conn is None:
+            return False
+        deleted = await redis_conn.delete(
+            _job_key(job_id), _usernames_key(job_id), _results_key(job_id), _committed_key(job_id)
+        )
+        if deleted:
+            logger.info(f"🗑️ Job {job_id} cancelado e removido")
+        return deleted > 0
+
+    def start(self, workers: int = JOB_WORKERS):
+        """Inicia os workers deste processo (chamado no lifespan da aplicação)"""
+        if self._tasks or workers <= 0:
+            return
+        self.consumer_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._processing_key = f"{JOBS_PROCESSING_PREFIX}{self.consumer_id}"
+        self._heartbeat_key = f"{JOBS_HEARTBEAT_PREFIX}{self.consumer_id}"
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+        self._tasks += [asyncio.create_task(self._worker_loop()) for _ in range(workers)]
+        logger.info(f"🚀 {workers} workers de jobs iniciados (consumidor {self.consumer_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.consumer_id is None:
+            return
+        # Devolve imediatamente à fila os itens que este processo não terminou
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                await self._requeue(redis_conn, self._processing_key)
+                await redis_conn.delete(self._heartbeat_key)
+        except Exception as e:
+            logger.error(f"Erro ao devolver itens de jobs à fila: {e}")
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                redis_conn = await get_redis()
+                if redis_conn is not None:
+                    await redis_conn.set(self._heartbeat_key, time.time(), ex=JOB_HEARTBEAT_TTL)
+                    await self._recover_orphans(redis_conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no heartbeat de jobs: {e}")
+            await asyncio.sleep(JOB_HEARTBEAT_TTL / 3)
+
+    async def _recover_orphans(self, redis_conn):
+        """Devolve à fila os itens de consumidores cujo heartbeat expirou (processo morto)"""
+        async for processing_key in redis_conn.scan_iter(match=f"{JOBS_PROCESSING_PREFIX}*"):
+            consumer_id = processing_key[len(JOBS_PROCESSING_PREFIX):]
+            if consumer_id == self.consumer_id or await redis_conn.exists(f"{JOBS_HEARTBEAT_PREFIX}{consumer_id}"):
+                continue
+            recovered = await self._requeue(redis_conn, processing_key)
+            if recovered:
+                logger.warning(f"♻️ {recovered} itens de jobs do consumidor {consumer_id} devolvidos à fila")
+
+    @staticmethod
+    async def _requeue(redis_conn, processing_key: str) -> int:
+        recovered = 0
+        while await redis_conn.lmove(processing_key, JOBS_QUEUE_KEY, "RIGHT", "RIGHT") is not None:
+            recovered += 1
+        return recovered
+
+    async def _worker_loop(self):
+        while True:
+            item = None
+            try:
+                redis_conn = await get_redis()
+                if redis_conn is None:
+                    await asyncio.sleep(JOB_POLL_INTERVAL * 5)
+                    continue
+                item = await redis_conn.lmove(JOBS_QUEUE_KEY, self._processing_key, "RIGHT", "LEFT")
+                if item is None:
+                    await asyncio.sleep(JOB_POLL_INTERVAL)
+                    continue
+                await self._process(redis_conn, item)
+                await redis_conn.lrem(self._processing_key, 1, item)
+            except asyncio.CancelledError:
+                # O item fica na lista de processamento e é devolvido à fila em stop()
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao processar item de job {item}: {e}")
+                if item is not None:
+                    try:
+                        await self._fail(redis_conn, item, e)
+                    except Exception as fail_error:
+                        # O item fica na lista de processamento e volta à fila em stop() ou pelo heartbeat
+                        logger.error(f"Erro ao devolver item de job {item} à fila: {fail_error}")
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    async def _fail(self, redis_conn, item: str, error: Exception):
+        """Devolve o item à fila ou, esgotadas as tentativas, grava seus usernames como erro"""
+        job_id, offset = item.rsplit(":", 1)
+        attempts = await redis_conn.eval(
+            _FAIL_ITEM_SCRIPT, 3, _job_key(job_id), self._processing_key, JOBS_QUEUE_KEY,
+            item, offset, JOB_MAX_ATTEMPTS
+        )
+        if attempts == 0 or attempts < JOB_MAX_ATTEMPTS:
+            return
+        logger.warning(f"⚠️ Item {item} falhou {attempts} vezes; usernames gravados como erro")
+        job = await redis_conn.hgetall(_job_key(job_id))
+        if job and job["state"] in ("queued", "running"):
+            if job["state"] == "queued":
+                await redis_conn.eval(_START_JOB_SCRIPT, 1, _job_key(job_id), time.time())
+            offset = int(offset)
+            usernames = await redis_conn.lrange(_usernames_key(job_id), offset, offset + JOB_CHUNK_SIZE - 1)
+            entries = [
+                {"username": username, "status": "error", "message": f"Failed to process: {error}"}
+                for username in usernames
+            ]
+            await self._commit(redis_conn, job_id, offset, len(usernames), int(job["total"]), entries)
+        # Só sai da lista de processamento depois de gravado (commit idempotente)
+        await redis_conn.lrem(self._processing_key, 1, item)
+
+    async def _process(self, redis_conn, item: str):
+        job_id, offset = item.rsplit(":", 1)
+        offset = int(offset)
+        job = await redis_conn.hgetall(_job_key(job_id))
+        if not job or job["state"] not in ("queued", "running"):
+            return  # job cancelado, removido ou expirado
+        if job["state"] == "queued":
+            await redis_conn.eval(_START_JOB_SCRIPT, 1, _job_key(job_id), time.time())
+
+        usernames = await redis_conn.lrange(_usernames_key(job_id), offset, offset + JOB_CHUNK_SIZE - 1)
+        fields = job["fields"].split(",")
+
+        # Import tardio: o serviço do Instagram é criado sob demanda
+        from services.instagram_service import get_instagram_service
+        service = await get_instagram_service()
+        await service.prepare_batch()
+        entries = [entry async for entry in service.stream_batch(usernames, fields, int(job["count"]))]
+
+        await self._commit(redis_conn, job_id, offset, len(usernames), int(job["total"]), entries)
+
+    @staticmethod
+    async def _commit(redis_conn, job_id: str, offset: int, size: int, total: int, entries: List[dict]):
+        summary = {"success": 0, "partial": 0, "error": 0}
+        for entry in entries:
+            summary[entry["status"]] += 1
+        done = await redis_conn.eval(
+            _COMMIT_CHUNK_SCRIPT, 4, _job_key(job_id), _results_key(job_id), _usernames_key(job_id),
+            _committed_key(job_id), size, summary["success"], summary["partial"], summary["error"],
+            time.time(), JOB_TTL, offset, *[json.dumps(entry, default=str) for entry in entries]
+        )
+        if done >= total:
+            logger.info(f"✅ Job {job_id} concluído")
+
+    def get_stats(self) -> Dict:
+        return {"consumer_id": self.consumer_id, "workers": max(len(self._tasks) - 1, 0)}
+
+
+# Instância global (uma por processo)
+job_queue = JobQueue()
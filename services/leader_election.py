@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from services.redis_cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Validade (segundos) do lease do líder; um líder que morre é substituído após esse tempo
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", 30))
+# Intervalo de renovação do lease (e de tentativa de eleição pelos demais processos)
+LEADER_RENEW_INTERVAL = float(os.getenv("LEADER_RENEW_INTERVAL", 10))
+
+# Renova o lease apenas se ele ainda pertence a este processo
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Libera o lease apenas se ele ainda pertence a este processo
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderElection:
+    """
+    Eleição de líder por lease no Redis: um único processo da implantação exerce o papel.
+
+    O líder é quem cria a chave leader:{name} (SET NX PX) e a renova a cada
+    LEADER_RENEW_INTERVAL. Se o processo morre, o lease expira em LEADER_LEASE_TTL e
+    outro processo assume; num encerramento normal (ex.: max_requests do gunicorn) o
+    lease é liberado em stop() e a troca é imediata. Sem Redis, ninguém é líder.
+    """
+
+    def __init__(self, name: str, lease_ttl: float = LEADER_LEASE_TTL, renew_interval: float = LEADER_RENEW_INTERVAL):
+        self.name = name
+        self.key = f"leader:{name}"
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        # Até quando (time.monotonic) o lease deste processo é garantidamente válido
+        self._lease_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._on_elected: Optional[Callable[[], Awaitable[None]]] = None
+        self._on_demoted: Optional[Callable[[], Awaitable[None]]] = None
+        self.stats = {"elections": 0, "demotions": 0}
+
+    def start(self, on_elected: Callable[[], Awaitable[None]], on_demoted: Callable[[], Awaitable[None]]):
+        """Inicia (uma vez por processo) a disputa pela liderança"""
+        if self._task is not None and not self._task.done():
+            return
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Deixa a disputa e libera o lease, para que outro processo assuma imediatamente"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            try:
+                redis_conn = await get_redis()
+                if redis_conn is not None:
+                    await redis_conn.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+            except Exception as e:
+                logger.error(f"Erro ao liberar a liderança de {self.name}: {e}")
+            await self._demote()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na eleição de líder de {self.name}: {e}")
+            # Sem confirmação da renovação, o lease pode ter expirado: deixa de agir como líder
+            if self.is_leader and time.monotonic() >= self._lease_until:
+                logger.warning(f"👑 Lease de {self.name} não renovado a tempo")
+                await self._demote()
+            await asyncio.sleep(self.renew_interval)
+
+    async def _tick(self):
+        redis_conn = await get_redis()
+        if redis_conn is None:
+            return
+        lease_ms = int(self.lease_ttl * 1000)
+        started = time.monotonic()
+        if self.is_leader:
+            if await redis_conn.eval(_RENEW_SCRIPT, 1, self.key, self.token, lease_ms):
+                self._lease_until = started + self.lease_ttl
+            else:
+                logger.warning(f"👑 Liderança de {self.name} perdida para outro processo")
+                await self._demote()
+        elif await redis_conn.set(self.key, self.token, nx=True, px=lease_ms):
+            self._lease_until = started + self.lease_ttl
+            self.is_leader = True
+            self.stats["elections"] += 1
+            logger.info(f"👑 Processo {self.token} eleito líder de {self.name}")
+            await self._on_elected()
+
+    async def _demote(self):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        self.stats["demotions"] += 1
+        logger.info(f"👑 Processo {self.token} deixou a liderança de {self.name}")
+        try:
+            await self._on_demoted()
+        except Exception as e:
+            logger.error(f"Erro ao encerrar as tarefas do líder de {self.name}: {e}")
+
+    async def get_stats(self) -> Dict:
+        leader = None
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                leader = await redis_conn.get(self.key)
+        except Exception:
+            pass
+        return {"name": self.name, "token": self.token, "is_leader": self.is_leader, "leader": leader, **self.stats}
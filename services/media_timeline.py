@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.redis_cache import get_redis, singleflight
+
+logger = logging.getLogger(__name__)
+
+# Linha do tempo de mídias por usuário, compartilhada por posts e reels
+MEDIA_TIMELINE_TTL = int(os.getenv("MEDIA_TIMELINE_TTL", 1800))
+# Tamanho mínimo buscado no Instagram (cobre posts até 12 e a varredura de reels)
+MEDIA_TIMELINE_MIN_WINDOW = int(os.getenv("MEDIA_TIMELINE_MIN_WINDOW", 20))
+# Idade máxima (segundos) da linha do tempo reaproveitada ao atualizar o cache de posts/reels
+MEDIA_TIMELINE_REFRESH_MAX_AGE = float(os.getenv("MEDIA_TIMELINE_REFRESH_MAX_AGE", 300))
+MEDIA_TIMELINE_KEY_PREFIX = "timeline:"
+
+
+class MediaFetchError(Exception):
+    """O Instagram retornou uma resposta inesperada e o método alternativo também falhou"""
+
+
+def timeline_posts(timeline: Dict, count: int) -> List[str]:
+    """Códigos das últimas count mídias"""
+    return [item["code"] for item in timeline["items"][:count]]
+
+
+def timeline_reels(timeline: Dict, count: int) -> List[str]:
+    """Códigos dos últimos count reels dentro da janela"""
+    return [item["code"] for item in timeline["items"] if item.get("product_type") == "clips"][:count]
+
+
+class MediaTimelineCache:
+    """
+    Cache de uma única linha do tempo de mídias por usuário, com a maior janela já buscada.
+
+    /posts (qualquer count) e /reels são fatiados da mesma linha do tempo; o Instagram só é
+    consultado novamente quando alguém pede mais itens do que a janela em cache (e o perfil
+    ainda tem mais mídias) ou quando a linha do tempo expira. Com max_age, uma linha do
+    tempo mais antiga é buscada de novo (com a mesma janela).
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "fetches": 0, "extensions": 0, "refreshes": 0}
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"{MEDIA_TIMELINE_KEY_PREFIX}{user_id}"
+
+    @staticmethod
+    def covers(timeline: Optional[Dict], amount: int, max_age: Optional[float] = None) -> bool:
+        """A janela atende o pedido se tem itens suficientes ou se já contém todas as mídias"""
+        if timeline is None or (max_age is not None and time.time() - timeline["fetched_at"] > max_age):
+            return False
+        return timeline["exhausted"] or timeline["window"] >= amount
+
+    async def get(self, user_id: int) -> Optional[Dict]:
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                cached = await redis_conn.get(self._key(user_id))
+                if cached:
+                    return json.loads(cached)
+        except Exception as e:
+            logger.error(f"Erro ao ler linha do tempo de {user_id}: {e}")
+        return None
+
+    async def store(self, user_id: int, medias: List[Any], window: int) -> Dict:
+        """Converte as mídias do instagrapi e grava a linha do tempo"""
+        timeline = {
+            "items": [
+                {"code": media.code, "product_type": getattr(media, "product_type", None)}
+                for media in medias
+            ],
+            "window": window,
+            "exhausted": len(medias) < window,
+            # Username do dono no momento da busca: revela um user_id indexado que trocou de nome
+            "owner": getattr(getattr(medias[0], "user", None), "username", None) if medias else None,
+            "fetched_at": time.time(),
+        }
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                await redis_conn.setex(self._key(user_id), MEDIA_TIMELINE_TTL, json.dumps(timeline))
+        except Exception as e:
+            logger.error(f"Erro ao gravar linha do tempo de {user_id}: {e}")
+        return timeline
+
+    async def get_or_fetch(self, user_id: int, amount: int, fetcher: Callable[[int], Awaitable[List[Any]]],
+                           max_age: Optional[float] = None) -> Dict:
+        """
+        Retorna uma linha do tempo com pelo menos amount itens (ou todas as mídias do perfil)
+        e, se max_age for informado, buscada há no máximo max_age segundos.
+        fetcher(window) busca as mídias no Instagram; buscas concorrentes do mesmo usuário
+        são coalescidas.
+        """
+        timeline = await self.get(user_id)
+        if self.covers(timeline, amount, max_age):
+            self.stats["hits"] += 1
+            return timeline
+
+        # Um chamador pode ter aguardado a busca de uma janela menor: tenta mais uma vez
+        for _ in range(2):
+            timeline = await singleflight(
+                self._key(user_id), lambda: self._extend(user_id, amount, fetcher, max_age)
+            )
+            if self.covers(timeline, amount, max_age):
+                break
+        return timeline
+
+    async def _extend(self, user_id: int, amount: int, fetcher: Callable[[int], Awaitable[List[Any]]],
+                      max_age: Optional[float] = None) -> Dict:
+        current = await self.get(user_id)
+        if self.covers(current, amount, max_age):
+            return current
+
+        window = max(amount, MEDIA_TIMELINE_MIN_WINDOW, current["window"] if current else 0)
+        medias = await fetcher(window)
+        if current is None:
+            self.stats["fetches"] += 1
+        else:
+            self.stats["refreshes" if self.covers(current, amount) else "extensions"] += 1
+        logger.debug(f"Linha do tempo de {user_id} buscada com janela {window} ({len(medias)} mídias)")
+        return await self.store(user_id, medias, window)
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
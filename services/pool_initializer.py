@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Criações de cliente simultâneas na inicialização do pool
+POOL_INIT_CONCURRENCY = int(os.getenv("POOL_INIT_CONCURRENCY", 4))
+# Contas prontas para o worker começar a atender (as demais terminam em segundo plano)
+POOL_INIT_MIN_READY = int(os.getenv("POOL_INIT_MIN_READY", 1))
+# Tempo total (segundos) da inicialização; contas que não terminaram voltam à criação sob demanda
+POOL_INIT_TIMEOUT = float(os.getenv("POOL_INIT_TIMEOUT", 60))
+
+PENDING = "pending"
+INITIALIZING = "initializing"
+READY = "ready"
+FAILED = "failed"
+
+
+class PoolInitializer:
+    """
+    Cria os clientes de todas as contas em paralelo na inicialização do worker.
+
+    No máximo POOL_INIT_CONCURRENCY contas são inicializadas ao mesmo tempo. start()
+    retorna assim que POOL_INIT_MIN_READY contas estão prontas (ou todas terminaram);
+    o restante continua em segundo plano até POOL_INIT_TIMEOUT, quando as contas ainda
+    pendentes passam a ser criadas sob demanda pela primeira requisição que as usar.
+    """
+
+    def __init__(
+        self, concurrency: int = POOL_INIT_CONCURRENCY, min_ready: int = POOL_INIT_MIN_READY,
+        timeout: float = POOL_INIT_TIMEOUT
+    ):
+        self.concurrency = concurrency
+        self.min_ready = min_ready
+        self.timeout = timeout
+        self.readiness: Dict[str, str] = {}
+        self._ready_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def _ready_count(self) -> int:
+        return sum(1 for state in self.readiness.values() if state == READY)
+
+    async def start(self, account_ids: Iterable[str], initialize: Callable[[str], Awaitable[Any]]):
+        """Inicia a criação dos clientes e aguarda o mínimo de contas prontas (dentro do prazo)"""
+        account_ids: List[str] = list(account_ids)
+        if not account_ids:
+            return
+        self.started_at = time.time()
+        for account_id in account_ids:
+            self.readiness.setdefault(account_id, PENDING)
+        self._task = asyncio.create_task(self._run(account_ids, initialize))
+
+        min_ready = min(self.min_ready, len(account_ids))
+        if min_ready <= 0:
+            return
+        waiter = asyncio.create_task(self._ready_event.wait())
+        try:
+            await asyncio.wait({waiter, self._task}, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        logger.info(
+            f"🏊 {self._ready_count()}/{len(account_ids)} contas prontas em {time.time() - self.started_at:.2f}s"
+            f"{' (restante em segundo plano)' if not self._task.done() else ''}"
+        )
+
+    async def _run(self, account_ids: List[str], initialize: Callable[[str], Awaitable[Any]]):
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        min_ready = min(self.min_ready, len(account_ids))
+
+        async def initialize_one(account_id: str):
+            async with semaphore:
+                self.readiness[account_id] = INITIALIZING
+                try:
+                    client = await initialize(account_id)
+                except Exception as e:
+                    logger.error(f"Erro ao inicializar a conta {account_id}: {e}")
+                    client = None
+                self.readiness[account_id] = READY if client else FAILED
+                if self._ready_count() >= min_ready:
+                    self._ready_event.set()
+
+        tasks = [asyncio.create_task(initialize_one(account_id)) for account_id in account_ids]
+        _, pending = await asyncio.wait(tasks, timeout=self.timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for account_id in account_ids:
+            if self.readiness.get(account_id) in (PENDING, INITIALIZING):
+                # Prazo esgotado: a conta será criada sob demanda
+                self.readiness[account_id] = PENDING
+        self.finished_at = time.time()
+        logger.info(
+            f"🏁 Inicialização do pool concluída em {self.finished_at - self.started_at:.2f}s: "
+            f"{self._ready_count()}/{len(account_ids)} contas prontas"
+        )
+
+    def mark(self, account_id: str, state: str):
+        """Atualiza o estado de uma conta criada ou descartada fora da inicialização"""
+        self.readiness[account_id] = state
+
+    def forget(self, account_id: str):
+        self.readiness.pop(account_id, None)
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        counts: Dict[str, int] = {}
+        for state in self.readiness.values():
+            counts[state] = counts.get(state, 0) + 1
+        return {
+            "concurrency": self.concurrency,
+            "min_ready": self.min_ready,
+            "running": self._task is not None and not self._task.done(),
+            "duration": round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else None,
+            "counts": counts,
+            "accounts": dict(self.readiness),
+        }
@@ -0,0 +1,196 @@
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+from services.redis_cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+
+def _limits(kind: str, per_minute: int, per_hour: int) -> Tuple[int, int]:
+    prefix = f"RATE_LIMIT_{kind.upper()}"
+    return int(os.getenv(f"{prefix}_PER_MINUTE", per_minute)), int(os.getenv(f"{prefix}_PER_HOUR", per_hour))
+
+
+# Orçamento por conta e por tipo de chamada: (por minuto, por hora), somando todos os workers
+RATE_LIMITS: Dict[str, Tuple[int, int]] = {
+    "search": _limits("search", 20, 300),
+    "user_info": _limits("user_info", 30, 600),
+    "medias": _limits("medias", 30, 600),
+    "stories": _limits("stories", 20, 400),
+    "default": _limits("default", 30, 600),
+}
+
+# Métodos do instagrapi -> tipo de chamada (demais métodos usam "default")
+_CALL_KINDS = {
+    "search_users": "search",
+    "user_info": "user_info",
+    "user_medias": "medias",
+    "user_medias_v1": "medias",
+    "user_stories": "stories",
+}
+
+# Dois buckets (minuto e hora) verificados e consumidos atomicamente.
+# KEYS: buckets; ARGV: agora, custo e, para cada bucket, capacidade e taxa de reposição (tokens/s).
+# Retorna {1, 0} se consumiu ou {0, segundos até haver tokens}.
+_TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    redis.call('HSET', key, 'tokens', levels[i] - cost, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {1, '0'}
+"""
+
+# Mesma conta do script acima sem consumir nem gravar: segundos até haver `cost` tokens
+# em todos os buckets (0 = há orçamento)
+_TOKEN_BUCKET_PEEK_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+return tostring(wait)
+"""
+
+
+def call_kind(func: Callable) -> str:
+    """Tipo de chamada (para o orçamento) a partir do método do Client"""
+    return _CALL_KINDS.get(getattr(func, "__name__", ""), "default")
+
+
+class RateLimitExceeded(Exception):
+    """A conta não tem orçamento para este tipo de chamada; a requisição não foi enviada ao Instagram"""
+
+    def __init__(self, account_id: str, kind: str, retry_after: float):
+        super().__init__(f"Rate limit for {kind} exhausted on account {account_id} (retry in {retry_after:.1f}s)")
+        self.account_id = account_id
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token bucket por conta e tipo de chamada, compartilhado por todos os workers via Redis.
+
+    Cada chamada ao Instagram consome um token do bucket por minuto e do bucket por hora
+    da conta (script Lua, atômico). Quando o orçamento acaba, a chamada não é feita e a
+    conta fica marcada localmente como esgotada até haver tokens, para que o seletor de
+    contas a pule. Sem Redis, o limite não é aplicado.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, int]] = None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.limits = limits or RATE_LIMITS
+        self.enabled = enabled
+        # (conta, tipo) -> instante (time.time) em que volta a haver tokens
+        self._exhausted_until: Dict[Tuple[str, str], float] = {}
+        self.stats = {"allowed": 0, "denied": 0}
+
+    def _buckets(self, account_id: str, kind: str):
+        per_minute, per_hour = self.limits.get(kind, self.limits["default"])
+        keys = [f"ratelimit:{account_id}:{kind}:minute", f"ratelimit:{account_id}:{kind}:hour"]
+        args = [per_minute, per_minute / 60, per_hour, per_hour / 3600]
+        return keys, args
+
+    async def acquire(self, account_id: str, kind: str, cost: int = 1):
+        """Consome tokens da conta ou lança RateLimitExceeded"""
+        if not self.enabled:
+            return
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is None:
+                return
+            keys, args = self._buckets(account_id, kind)
+            allowed, wait = await redis_conn.eval(_TOKEN_BUCKET_SCRIPT, len(keys), *keys, time.time(), cost, *args)
+        except Exception as e:
+            logger.error(f"Erro no rate limiter ({account_id}/{kind}): {e}. Chamada permitida.")
+            return
+
+        if int(allowed):
+            self.stats["allowed"] += 1
+            return
+        retry_after = float(wait)
+        self.stats["denied"] += 1
+        self._exhausted_until[(account_id, kind)] = time.time() + retry_after
+        logger.warning(f"⏳ Orçamento de {kind} esgotado para a conta {account_id} (tokens em {retry_after:.1f}s)")
+        raise RateLimitExceeded(account_id, kind, retry_after)
+
+    def has_budget(self, account_id: str, kinds: Iterable[str]) -> bool:
+        """Verificação local (sem Redis): False se a conta foi recusada recentemente para algum dos tipos"""
+        now = time.time()
+        for kind in kinds:
+            until = self._exhausted_until.get((account_id, kind))
+            if until is not None:
+                if until > now:
+                    return False
+                del self._exhausted_until[(account_id, kind)]
+        return True
+
+    async def budget_wait(self, account_id: str, kinds: Iterable[str], cost: int = 1) -> float:
+        """
+        Segundos até a conta ter orçamento em todos os tipos, lidos dos buckets
+        compartilhados sem consumir tokens (0 = há orçamento ou limite não aplicado)
+        """
+        if not self.enabled:
+            return 0.0
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is None:
+                return 0.0
+            keys, args = [], []
+            for kind in kinds:
+                kind_keys, kind_args = self._buckets(account_id, kind)
+                keys += kind_keys
+                args += kind_args
+            return float(await redis_conn.eval(_TOKEN_BUCKET_PEEK_SCRIPT, len(keys), *keys, time.time(), cost, *args))
+        except Exception as e:
+            logger.error(f"Erro ao consultar o orçamento da conta {account_id}: {e}")
+            return 0.0
+
+    def forget(self, account_id: str):
+        for key in [key for key in self._exhausted_until if key[0] == account_id]:
+            del self._exhausted_until[key]
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        return {
+            "enabled": self.enabled,
+            "limits": {kind: {"per_minute": limits[0], "per_hour": limits[1]} for kind, limits in self.limits.items()},
+            "exhausted": [
+                {"account": account_id, "kind": kind, "retry_in": round(until - now, 1)}
+                for (account_id, kind), until in self._exhausted_until.items() if until > now
+            ],
+            **self.stats,
+        }
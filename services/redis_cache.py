@@ -1,10 +1,21 @@
 import redis.asyncio as redis
 import os
 import json
+import asyncio
+import inspect
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from fnmatch import fnmatchcase
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
 import logging
 
+from pydantic import BaseModel, ValidationError
+
 logger = logging.getLogger(__name__)
 
 # Configuração Redis
@@ -35,6 +46,7 @@ async def init_redis():
         # Testa conexão
         await redis_client.ping()
         logger.info("Redis connection established successfully with optimized settings")
+        _start_invalidation_listener()
     except Exception as e:
         logger.error(f"Failed to connect to Redis: {e}")
         redis_client = None
@@ -45,59 +57,595 @@ async def get_redis():
         await init_redis()
     return redis_client
 
-def redis_cache(ttl: int):
+async def close_redis():
+    """Encerra o listener de invalidação e a conexão Redis deste worker"""
+    global redis_client, _invalidation_task
+    if _invalidation_task is not None:
+        _invalidation_task.cancel()
+        _invalidation_task = None
+    if redis_client is not None:
+        await redis_client.close()
+        redis_client = None
+
+# Cache L1 em memória (por worker) na frente do Redis
+REDIS_CACHE_L1_SIZE = int(os.getenv("REDIS_CACHE_L1_SIZE", 2048))
+# TTL máximo padrão de uma entrada L1; cada função pode reduzir com l1_ttl (0 desativa)
+REDIS_CACHE_L1_TTL = int(os.getenv("REDIS_CACHE_L1_TTL", 30))
+# Canal pub/sub usado para invalidar o L1 de todos os workers
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+_UNSET = object()
+
+class CacheEntry:
+    """
+    Entrada de cache: payload JSON já serializado (pronto para ser enviado como corpo da
+    resposta), valor decodificado sob demanda e metadados de expiração.
+    validated indica que o payload foi validado pelo response_model no momento da escrita.
+
+    O valor retornado às chamadas internas é sempre o resultado original da função
+    (value_json), com o mesmo formato em qualquer camada; o payload é apenas o corpo da
+    resposta (pode omitir campos internos, ex.: Field(exclude=True)). Sem response_model,
+    os dois são o mesmo JSON.
+    """
+
+    __slots__ = ("value_json", "payload_json", "soft_expiry", "delta", "validated", "_value")
+
+    def __init__(self, value_json: str, payload_json: str, soft_expiry: float, delta: float, validated: bool,
+                 value: Any = _UNSET):
+        self.value_json = value_json
+        self.payload_json = payload_json
+        self.soft_expiry = soft_expiry
+        self.delta = delta
+        self.validated = validated
+        self._value = value
+
+    @property
+    def value(self) -> Any:
+        if self._value is _UNSET:
+            self._value = json.loads(self.value_json)
+        return self._value
+
+class L1Cache:
+    """
+    Cache LRU limitado com expiração por entrada, servido sem tocar a rede.
+    Os valores retornados são compartilhados entre chamadas e não devem ser modificados.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Retorna a entrada ou None se ausente/expirada"""
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, entry = item
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, entry: CacheEntry, expires_at: float):
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        self._entries[key] = (expires_at, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_pattern(self, pattern: str) -> int:
+        """Remove as entradas cujo nome casa com o padrão glob (mesma sintaxe do Redis KEYS)"""
+        keys = [key for key in self._entries if fnmatchcase(key, pattern)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+l1_cache = L1Cache(REDIS_CACHE_L1_SIZE)
+_invalidation_task: Optional[asyncio.Task] = None
+
+def _start_invalidation_listener():
+    """Inicia (uma vez por worker) a escuta das invalidações publicadas pelos outros workers"""
+    global _invalidation_task
+    if _invalidation_task is not None and not _invalidation_task.done():
+        return
+    try:
+        _invalidation_task = asyncio.get_running_loop().create_task(_invalidation_listener())
+    except RuntimeError:
+        logger.warning("No running event loop; L1 invalidation listener not started")
+
+async def _invalidation_listener():
+    """Consome o canal de invalidação e remove as entradas correspondentes do L1"""
+    while True:
+        pubsub = None
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is None:
+                await asyncio.sleep(5)
+                continue
+            pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    removed = l1_cache.invalidate_pattern(message["data"])
+                    logger.debug(f"L1 invalidation '{message['data']}': {removed} entries removed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"L1 invalidation listener error: {e}. Reconnecting...")
+            await asyncio.sleep(1)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+async def publish_invalidation(pattern: str):
+    """Remove as entradas do L1 local e avisa os outros workers"""
+    l1_cache.invalidate_pattern(pattern)
+    redis_conn = await get_redis()
+    if redis_conn is not None:
+        await redis_conn.publish(CACHE_INVALIDATION_CHANNEL, pattern)
+
+# Singleflight: chamadas em andamento por cache_key dentro deste worker
+_inflight: Dict[str, asyncio.Task] = {}
+# Atualizações em segundo plano em andamento (separadas para que misses não aguardem um refresh abortado)
+_refreshing: Dict[str, asyncio.Task] = {}
+
+# Marca a execução de uma atualização em segundo plano (ver is_cache_refresh)
+_cache_refresh: ContextVar[bool] = ContextVar("cache_refresh", default=False)
+
+def is_cache_refresh() -> bool:
+    """True dentro de uma atualização em segundo plano: caches internos lidos pela função
+    não devem servir dados antigos, senão a idade se soma à do cache atualizado"""
+    return _cache_refresh.get()
+
+# Modo distribuído: um lock curto no Redis garante que apenas um worker recalcula a chave
+REDIS_CACHE_DISTRIBUTED_LOCK = os.getenv("REDIS_CACHE_DISTRIBUTED_LOCK", "false").lower() == "true"
+REDIS_CACHE_LOCK_TTL_MS = int(os.getenv("REDIS_CACHE_LOCK_TTL_MS", 15000))
+REDIS_CACHE_LOCK_POLL_INTERVAL = 0.05
+
+# Stale-while-revalidate: após o ttl (expiração suave) o valor ainda é servido por
+# ttl * REDIS_CACHE_STALE_FACTOR segundos enquanto é atualizado em segundo plano
+REDIS_CACHE_STALE_FACTOR = float(os.getenv("REDIS_CACHE_STALE_FACTOR", 1.0))
+# Atualização antecipada probabilística (XFetch); 0 desativa
+REDIS_CACHE_XFETCH_BETA = float(os.getenv("REDIS_CACHE_XFETCH_BETA", 1.0))
+
+# Remove o lock apenas se ainda pertencer a quem o criou
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def _bind_arguments(signature: inspect.Signature, args: tuple, kwargs: dict) -> inspect.BoundArguments:
+    """Normaliza os argumentos da chamada de acordo com a assinatura (com defaults)"""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return bound
+
+def _make_cache_key(func: Callable, bound: inspect.BoundArguments) -> str:
+    """
+    Cria uma chave de cache estável a partir dos argumentos normalizados pela assinatura.
+    Ignora self e o parâmetro db (posicional ou nomeado), que não fazem parte do resultado.
+    """
+    key_parts = [func.__name__]
+    for name, value in list(bound.arguments.items())[1:]:
+        if name == 'db':
+            continue
+        key_parts.append(value)
+    return ":".join(map(str, key_parts))
+
+def _detached_call(bound: inspect.BoundArguments) -> tuple:
+    """
+    Argumentos para uma execução em segundo plano: a sessão db pertence à requisição
+    original e pode ser fechada antes da atualização terminar.
+    """
+    arguments = dict(bound.arguments)
+    if 'db' in arguments:
+        arguments['db'] = None
+    detached = inspect.BoundArguments(bound.signature, arguments)
+    return detached.args, detached.kwargs
+
+def _is_cacheable(result: Any) -> bool:
+    """Apenas resultados bem-sucedidos são armazenados"""
+    return isinstance(result, dict) and result.get("status") == "success"
+
+def _pack(entry: CacheEntry) -> str:
+    """
+    Serializa o envelope do cache: expiração suave|tempo de cálculo|marcador|JSON.
+    Sem validação o JSON é o valor; validado, o marcador "b<n>" indica que os n primeiros
+    caracteres são o valor e o restante é o payload, que fica intacto no final para poder
+    ser enviado sem desserialização.
+    """
+    if not entry.validated:
+        return f"{entry.soft_expiry:.3f}|{entry.delta:.4f}||{entry.value_json}"
+    return f"{entry.soft_expiry:.3f}|{entry.delta:.4f}|b{len(entry.value_json)}|{entry.value_json}{entry.payload_json}"
+
+def _unpack(cached_value: str) -> CacheEntry:
+    """
+    Lê o envelope do cache.
+    Valores no formato antigo (JSON puro, sem marcador ou com o marcador "v", cujo valor era
+    o payload da resposta) são tratados como já expirados (suavemente) e não validados.
+    """
+    if cached_value.startswith("{"):
+        return CacheEntry(cached_value, cached_value, 0.0, 0.0, False)
+    soft_expiry, delta, rest = cached_value.split("|", 2)
+    if rest.startswith("{"):
+        return CacheEntry(rest, rest, float(soft_expiry), float(delta), False)
+    marker, body = rest.split("|", 1)
+    if marker.startswith("b"):
+        size = int(marker[1:])
+        return CacheEntry(body[:size], body[size:], float(soft_expiry), float(delta), True)
+    return CacheEntry(body, body, float(soft_expiry), float(delta), False)
+
+def _should_refresh(soft_expiry: float, delta: float) -> bool:
+    """
+    Decide se um hit deve disparar atualização em segundo plano: sempre após a expiração
+    suave e, antes dela, com probabilidade crescente conforme se aproxima (XFetch).
+    Chaves muito acessadas rolam o dado mais vezes e quase nunca chegam a expirar.
+    """
+    now = time.time()
+    if now >= soft_expiry:
+        return True
+    if REDIS_CACHE_XFETCH_BETA <= 0 or delta <= 0:
+        return False
+    return now - delta * REDIS_CACHE_XFETCH_BETA * math.log(1.0 - random.random()) >= soft_expiry
+
+def _fill_l1(cache_key: str, entry: CacheEntry, stale_ttl: int, l1_ttl: int):
+    """Guarda a entrada no L1 sem ultrapassar a expiração rígida da entrada no Redis"""
+    if l1_ttl > 0:
+        expires_at = min(time.time() + l1_ttl, entry.soft_expiry + stale_ttl)
+        l1_cache.set(cache_key, entry, expires_at)
+
+def _serialize(result: Any, response_model: Optional[Type[BaseModel]]) -> Optional[str]:
+    """
+    Serializa o payload da resposta uma única vez, no momento da escrita.
+    Com response_model, ele é validado e serializado exatamente como a resposta HTTP.
+    """
+    try:
+        return response_model.model_validate(result).model_dump_json()
+    except ValidationError as e:
+        logger.warning(f"Result does not match {response_model.__name__}, not caching: {e}")
+        return None
+
+async def _store(redis_conn: Optional[redis.Redis], cache_key: str, ttl: int, stale_ttl: int, l1_ttl: int,
+                 result: Any, delta: float, response_model: Optional[Type[BaseModel]] = None) -> Optional[CacheEntry]:
+    """Armazena o resultado no cache (apenas se for bem-sucedido) com expiração suave e rígida"""
+    if not _is_cacheable(result):
+        return None
+    value_json = json.dumps(result)
+    payload_json = value_json if response_model is None else _serialize(result, response_model)
+    if payload_json is None:
+        return None
+    entry = CacheEntry(value_json, payload_json, time.time() + ttl, delta, response_model is not None, value=result)
+    _fill_l1(cache_key, entry, stale_ttl, l1_ttl)
+    if redis_conn is not None:
+        await redis_conn.setex(cache_key, ttl + stale_ttl, _pack(entry))
+    return entry
+
+async def _wait_for_peer(redis_conn: redis.Redis, cache_key: str, lock_key: str) -> Optional[str]:
+    """
+    Aguarda outro worker (dono do lock) preencher a chave.
+    Retorna o valor cacheado ou None se o lock sumir/expirar sem resultado.
+    """
+    deadline = time.monotonic() + REDIS_CACHE_LOCK_TTL_MS / 1000
+    while time.monotonic() < deadline:
+        await asyncio.sleep(REDIS_CACHE_LOCK_POLL_INTERVAL)
+        cached_result = await redis_conn.get(cache_key)
+        if cached_result:
+            return cached_result
+        if not await redis_conn.exists(lock_key):
+            return None
+    return None
+
+async def _compute(func: Callable, args: tuple, kwargs: dict, cache_key: str, ttl: int, stale_ttl: int,
+                   l1_ttl: int, distributed_lock: bool, response_model: Optional[Type[BaseModel]] = None,
+                   refresh: bool = False) -> Tuple[Any, Optional[CacheEntry]]:
+    """
+    Executa a função e grava o resultado, coordenando com os outros workers se necessário.
+    Retorna (resultado, entrada de cache ou None se o resultado não foi cacheado).
+    Em uma atualização em segundo plano (refresh), desiste se outro worker já estiver atualizando.
+    """
+    # Se Redis não disponível, executa a função e guarda apenas no L1
+    redis_conn = await get_redis()
+
+    lock_key = f"lock:{cache_key}"
+    token = None
+    if distributed_lock and redis_conn is not None:
+        try:
+            token = uuid.uuid4().hex
+            if not await redis_conn.set(lock_key, token, nx=True, px=REDIS_CACHE_LOCK_TTL_MS):
+                token = None
+                if refresh:
+                    return None, None
+                # Outro worker está calculando esta chave: espera pelo resultado dele
+                cached_result = await _wait_for_peer(redis_conn, cache_key, lock_key)
+                if cached_result:
+                    logger.debug(f"Cache FILLED by peer for key: {cache_key}")
+                    entry = _unpack(cached_result)
+                    _fill_l1(cache_key, entry, stale_ttl, l1_ttl)
+                    return entry.value, entry
+        except Exception as e:
+            logger.error(f"Redis lock error: {e}. Computing locally.")
+            token = None
+
+    try:
+        start_time = time.monotonic()
+        refresh_token = _cache_refresh.set(refresh)
+        try:
+            result = await func(*args, **kwargs)
+        finally:
+            _cache_refresh.reset(refresh_token)
+        entry = None
+        try:
+            entry = await _store(
+                redis_conn, cache_key, ttl, stale_ttl, l1_ttl, result, time.monotonic() - start_time, response_model
+            )
+        except Exception as e:
+            logger.error(f"Redis cache error: {e}. Result not cached.")
+        return result, entry
+    finally:
+        if token:
+            try:
+                await redis_conn.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                logger.error(f"Error releasing cache lock {lock_key}: {e}")
+
+def _discard_task(registry: Dict[str, asyncio.Task], cache_key: str, task: asyncio.Task):
+    """Remove a execução concluída do registro e consome exceções não observadas"""
+    if registry.get(cache_key) is task:
+        del registry[cache_key]
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Background cache call for {cache_key} failed: {task.exception()}")
+
+def _start_task(registry: Dict[str, asyncio.Task], cache_key: str, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """Retorna a execução em andamento para a chave no registro ou inicia uma nova"""
+    task = registry.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        registry[cache_key] = task
+        task.add_done_callback(lambda t: _discard_task(registry, cache_key, t))
+    return task
+
+async def _singleflight(cache_key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Garante uma única execução em andamento por cache_key neste worker.
+    Chamadas concorrentes aguardam a mesma tarefa; o cancelamento de um chamador não afeta os demais.
+    """
+    if cache_key in _inflight:
+        logger.debug(f"Cache MISS coalesced for key: {cache_key}")
+    return await asyncio.shield(_start_task(_inflight, cache_key, factory))
+
+async def singleflight(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Coalesce chamadas concorrentes com a mesma chave (fora do decorator) em uma única execução"""
+    return await _singleflight(key, factory)
+
+def _schedule_refresh(cache_key: str, factory: Callable[[], Awaitable[Any]]):
+    """Agenda uma única atualização em segundo plano por chave (não aguarda o resultado)"""
+    if cache_key in _refreshing or cache_key in _inflight:
+        return
+    logger.debug(f"Cache REFRESH scheduled for key: {cache_key}")
+    _start_task(_refreshing, cache_key, factory)
+
+def redis_cache(ttl: int, stale_ttl: Optional[int] = None, l1_ttl: Optional[int] = None,
+                distributed_lock: Optional[bool] = None, response_model: Optional[Type[BaseModel]] = None):
     """
     Decorator para cachear o resultado de uma função no Redis por um tempo (ttl) em segundos.
     Versão otimizada para melhor performance.
+
+    Um cache L1 em memória (LRU limitado por REDIS_CACHE_L1_SIZE) fica na frente do Redis;
+    suas entradas vivem no máximo l1_ttl segundos (padrão REDIS_CACHE_L1_TTL, limitado ao ttl).
+
+    O ttl é a expiração suave: depois dele o valor ainda é servido por stale_ttl segundos
+    (padrão ttl * REDIS_CACHE_STALE_FACTOR) enquanto uma única atualização roda em segundo
+    plano. Hits próximos da expiração disparam atualização antecipada probabilística (XFetch).
+
+    Misses concorrentes da mesma chave no mesmo worker compartilham uma única execução
+    (singleflight). Com distributed_lock (ou REDIS_CACHE_DISTRIBUTED_LOCK=true), um lock
+    curto no Redis faz com que apenas um worker recalcule a chave enquanto os outros aguardam.
+
+    Com response_model, o resultado é validado e serializado uma vez na escrita; use
+    cached_json() para enviar esse JSON diretamente como corpo da resposta.
     """
+    use_lock = REDIS_CACHE_DISTRIBUTED_LOCK if distributed_lock is None else distributed_lock
+    stale_seconds = int(ttl * REDIS_CACHE_STALE_FACTOR) if stale_ttl is None else stale_ttl
+    l1_seconds = min(REDIS_CACHE_L1_TTL if l1_ttl is None else l1_ttl, ttl)
+    # Entradas não validadas (formato antigo) não podem ser servidas como resposta pronta
+    require_validated = response_model is not None
+
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # Cria uma chave de cache estável, ignorando o parâmetro db
-            filtered_kwargs = {k: v for k, v in kwargs.items() if k != 'db'}
-            key_parts = [func.__name__] + list(args[1:]) + [f"{k}={v}" for k, v in sorted(filtered_kwargs.items())]
-            cache_key = ":".join(map(str, key_parts))
+        signature = inspect.signature(func)
+
+        def compute(args: tuple, kwargs: dict, cache_key: str, refresh: bool = False):
+            return _compute(
+                func, args, kwargs, cache_key, ttl, stale_seconds, l1_seconds, use_lock, response_model, refresh
+            )
+
+        def schedule_refresh(cache_key: str, bound: inspect.BoundArguments):
+            refresh_args, refresh_kwargs = _detached_call(bound)
+            _schedule_refresh(cache_key, lambda: compute(refresh_args, refresh_kwargs, cache_key, refresh=True))
+
+        def usable(entry: Optional[CacheEntry]) -> bool:
+            return entry is not None and (entry.validated or not require_validated)
+
+        async def cached_call(args: tuple, kwargs: dict) -> Tuple[Optional[CacheEntry], Any]:
+            """Retorna (entrada de cache, resultado); a entrada é None quando o resultado não é cacheável"""
+            bound = _bind_arguments(signature, args, kwargs)
+            cache_key = _make_cache_key(func, bound)
+
+            # 1. L1 em memória: sem rede e sem desserialização
+            if l1_seconds > 0:
+                entry = l1_cache.get(cache_key)
+                if usable(entry):
+                    if _should_refresh(entry.soft_expiry, entry.delta):
+                        schedule_refresh(cache_key, bound)
+                    return entry, None
             
             try:
                 redis_conn = await get_redis()
-                if redis_conn is None:
-                    # Se Redis não disponível, executa função sem cache
-                    return await func(*args, **kwargs)
-                
-                # 1. Tenta obter o resultado do cache com timeout reduzido
-                cached_result = await redis_conn.get(cache_key)
-                if cached_result:
-                    logger.debug(f"Cache HIT for key: {cache_key}")
-                    return json.loads(cached_result)
-                
-                # 2. Se não estiver no cache, executa a função
-                logger.debug(f"Cache MISS for key: {cache_key}")
-                result = await func(*args, **kwargs)
-                
-                # 3. Armazena o resultado no cache apenas se for bem-sucedido
-                # Usa pipeline para melhor performance
-                if isinstance(result, dict) and result.get("status") == "success":
-                    pipe = redis_conn.pipeline()
-                    pipe.setex(cache_key, ttl, json.dumps(result))
-                    await pipe.execute()
-                
-                return result
-                
+                if redis_conn is not None:
+                    # 2. Tenta obter o resultado do Redis
+                    cached_result = await redis_conn.get(cache_key)
+                    if cached_result:
+                        entry = _unpack(cached_result)
+                        if usable(entry):
+                            logger.debug(f"Cache HIT for key: {cache_key}")
+                            _fill_l1(cache_key, entry, stale_seconds, l1_seconds)
+                            if _should_refresh(entry.soft_expiry, entry.delta):
+                                schedule_refresh(cache_key, bound)
+                            return entry, None
             except Exception as e:
                 logger.error(f"Redis cache error: {e}. Bypassing cache.")
-                # Em caso de erro, executa a função original sem cache
-                return await func(*args, **kwargs)
-        
+            
+            # 3. Se não estiver no cache, executa a função uma única vez por chave
+            logger.debug(f"Cache MISS for key: {cache_key}")
+            result, entry = await _singleflight(cache_key, lambda: compute(args, kwargs, cache_key))
+            return entry, result
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            entry, result = await cached_call(args, kwargs)
+            return entry.value if entry is not None else result
+
+        async def as_json(*args, **kwargs) -> Tuple[Optional[str], Any]:
+            entry, result = await cached_call(args, kwargs)
+            if entry is not None:
+                return entry.payload_json, None
+            return None, result
+
+        async def peek(*args, **kwargs) -> Any:
+            """Retorna o valor cacheado (L1 ou Redis) sem executar a função, ou None"""
+            cache_key = _make_cache_key(func, _bind_arguments(signature, args, kwargs))
+            entry = l1_cache.get(cache_key) if l1_seconds > 0 else None
+            if usable(entry):
+                return entry.value
+            try:
+                redis_conn = await get_redis()
+                if redis_conn is not None:
+                    cached_result = await redis_conn.get(cache_key)
+                    if cached_result:
+                        entry = _unpack(cached_result)
+                        if usable(entry):
+                            _fill_l1(cache_key, entry, stale_seconds, l1_seconds)
+                            return entry.value
+            except Exception as e:
+                logger.error(f"Redis cache error: {e}. Peek skipped.")
+            return None
+
+        async def prime(result: Any, *args, **kwargs) -> bool:
+            """Grava no cache um resultado obtido fora da função (ex.: endpoint combinado)"""
+            cache_key = _make_cache_key(func, _bind_arguments(signature, args, kwargs))
+            try:
+                entry = await _store(
+                    await get_redis(), cache_key, ttl, stale_seconds, l1_seconds, result, 0.0, response_model
+                )
+                return entry is not None
+            except Exception as e:
+                logger.error(f"Redis cache error: {e}. Prime skipped.")
+                return False
+
+        def cache_key_for(*args, **kwargs) -> str:
+            return _make_cache_key(func, _bind_arguments(signature, args, kwargs))
+
+        def from_l1(cache_key: str) -> Any:
+            entry = l1_cache.get(cache_key) if l1_seconds > 0 else None
+            return entry.value if usable(entry) else None
+
+        def accept(cache_key: str, cached_value: str) -> Any:
+            """Converte um valor lido do Redis (ex.: via MGET) e preenche o L1; None se inutilizável"""
+            entry = _unpack(cached_value)
+            if not usable(entry):
+                return None
+            _fill_l1(cache_key, entry, stale_seconds, l1_seconds)
+            return entry.value
+
+        wrapper.cached_json = as_json
+        wrapper.peek = peek
+        wrapper.prime = prime
+        wrapper.cache_key = cache_key_for
+        wrapper.from_l1 = from_l1
+        wrapper.accept = accept
         return wrapper
     return decorator
 
+async def cached_json(method: Callable, *args, **kwargs) -> Tuple[Optional[str], Any]:
+    """
+    Caminho rápido para as rotas: chama um método decorado com redis_cache e retorna
+    (payload_json, None) quando o resultado está (ou acabou de ser colocado) no cache,
+    ou (None, resultado) quando o resultado não é cacheável (ex.: erro).
+    O payload_json pode ser enviado diretamente como corpo da resposta, sem json.loads
+    nem nova validação pelo response_model.
+    """
+    return await method.__func__.cached_json(method.__self__, *args, **kwargs)
+
+async def peek_cached(method: Callable, *args, **kwargs) -> Any:
+    """Consulta o cache de um método decorado com redis_cache sem executá-lo (None se ausente)"""
+    return await method.__func__.peek(method.__self__, *args, **kwargs)
+
+async def peek_cached_many(calls: List[Tuple[Callable, tuple]]) -> List[Any]:
+    """
+    Versão em lote de peek_cached: recebe [(método decorado, args), ...] e retorna os
+    valores cacheados na mesma ordem (None se ausente). Consulta o L1 primeiro e busca
+    as chaves restantes com um único MGET no Redis.
+    """
+    results: List[Any] = [None] * len(calls)
+    keys = [method.__func__.cache_key(method.__self__, *args) for method, args in calls]
+    remote = []
+    for i, (method, _) in enumerate(calls):
+        value = method.__func__.from_l1(keys[i])
+        if value is not None:
+            results[i] = value
+        else:
+            remote.append(i)
+    if not remote:
+        return results
+
+    try:
+        redis_conn = await get_redis()
+        if redis_conn is not None:
+            values = await redis_conn.mget([keys[i] for i in remote])
+            for i, cached_value in zip(remote, values):
+                if cached_value:
+                    results[i] = calls[i][0].__func__.accept(keys[i], cached_value)
+    except Exception as e:
+        logger.error(f"Redis cache error: {e}. Batch peek skipped.")
+    return results
+
+async def prime_cached(method: Callable, result: Any, *args, **kwargs) -> bool:
+    """Preenche o cache de um método decorado com redis_cache com um resultado já calculado"""
+    return await method.__func__.prime(result, method.__self__, *args, **kwargs)
+
 async def clear_cache_pattern(pattern: str) -> bool:
-    """Limpa cache baseado em padrão"""
+    """Limpa cache baseado em padrão (Redis e L1 de todos os workers)"""
     try:
         redis_conn = await get_redis()
         if redis_conn is None:
+            l1_cache.invalidate_pattern(pattern)
             return False
         
+        await publish_invalidation(pattern)
         keys = await redis_conn.keys(pattern)
         if keys:
             await redis_conn.delete(*keys)
@@ -122,7 +670,8 @@ async def get_cache_stats() -> dict:
             "used_memory_human": info.get("used_memory_human", "0B"),
             "total_commands_processed": info.get("total_commands_processed", 0),
             "keyspace_hits": info.get("keyspace_hits", 0),
-            "keyspace_misses": info.get("keyspace_misses", 0)
+            "keyspace_misses": info.get("keyspace_misses", 0),
+            "l1": l1_cache.get_stats()
         }
     except Exception as e:
         logger.error(f"Error getting cache stats: {e}")
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import os
+import random
+
+import requests
+from instagrapi.exceptions import (
+    ChallengeRequired, ClientConnectionError, ClientError, ClientRequestTimeout, ClientThrottledError,
+    FeedbackRequired, LoginRequired, PleaseWaitFewMinutes, RateLimitError, ReloginAttemptExceeded, SentryBlock,
+)
+
+from services.media_timeline import MediaFetchError
+from services.rate_limiter import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+# Tentativas por requisição (cada nova tentativa em outra conta)
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 3))
+# Backoff exponencial com jitter completo entre tentativas (segundos)
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.2))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 2.0))
+# Prazo total (segundos) de uma requisição ao Instagram, incluindo as novas tentativas
+RETRY_DEADLINE = float(os.getenv("RETRY_DEADLINE", 25))
+
+# Falhas ligadas à conta ou à rede: outra conta provavelmente terá sucesso
+_RETRYABLE_ERRORS = (
+    RateLimitExceeded, MediaFetchError,
+    ChallengeRequired, FeedbackRequired, LoginRequired, PleaseWaitFewMinutes, RateLimitError,
+    ClientThrottledError, SentryBlock, ReloginAttemptExceeded,
+    ClientConnectionError, ClientRequestTimeout,
+    requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+    asyncio.TimeoutError,
+)
+
+
+class NoAccountAvailable(Exception):
+    """Nenhuma conta disponível (em quarentena, sem orçamento ou já tentadas nesta requisição)"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Classifica uma exceção do instagrapi: True para falhas transitórias ou da conta
+    (sessão, throttling, rede, 5xx), False para erros do alvo (usuário inexistente,
+    requisição inválida) e erros desconhecidos, que se repetiriam em qualquer conta.
+    """
+    if isinstance(error, _RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, ClientError):
+        return error.code is not None and error.code >= 500
+    return False
+
+
+def backoff_delay(attempt: int) -> float:
+    """Espera antes da tentativa seguinte à tentativa número attempt (1, 2, ...)"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
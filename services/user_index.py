@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database import AsyncSessionLocal, InstagramUserIndex
+from services.redis_cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Hash Redis com username -> user_id compartilhado por todos os workers
+# (valor "pk" ou "pk:h" quando a entrada foi colhida de um search_users de outro username)
+USER_INDEX_REDIS_KEY = "user_index"
+# Contadores globais (todos os workers) do índice
+USER_INDEX_STATS_KEY = "user_index:stats"
+# Índice de privacidade colhido das buscas (privacidade pode mudar, então expira)
+PRIVACY_INDEX_PREFIX = "privacy_index:"
+PRIVACY_INDEX_TTL = int(os.getenv("PRIVACY_INDEX_TTL", 600))
+# Entradas mantidas em memória por worker
+USER_INDEX_MEMORY_SIZE = int(os.getenv("USER_INDEX_MEMORY_SIZE", 50000))
+# Entradas carregadas do Postgres na inicialização (as mais recentes)
+USER_INDEX_PRELOAD_LIMIT = int(os.getenv("USER_INDEX_PRELOAD_LIMIT", 20000))
+# Intervalo para agrupar as escritas no Postgres
+USER_INDEX_FLUSH_INTERVAL = 1.0
+
+
+class UserIndex:
+    """
+    Índice persistente username -> user_id consultado antes de qualquer search_users.
+
+    Três camadas: memória (LRU por worker) -> hash no Redis -> tabela instagram_user_index.
+    Os pks do Instagram nunca mudam, mas o username sim (renomeação, nome reaproveitado por
+    outra pessoa, conta removida): as entradas não expiram, e quem detecta que uma resolução
+    não vale mais a descarta com forget(). As escritas no Postgres são agrupadas e feitas em
+    segundo plano para não atrasar as requisições.
+
+    Todos os usuários retornados por um search_users são colhidos (harvest), não só o
+    username procurado; hits nessas entradas colhidas são buscas evitadas e são contados.
+    """
+
+    def __init__(self, memory_size: int = USER_INDEX_MEMORY_SIZE):
+        self.memory_size = memory_size
+        # username -> (user_id, colhido)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending: Dict[str, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {
+            "memory_hits": 0, "redis_hits": 0, "db_hits": 0, "misses": 0, "stored": 0,
+            "harvested": 0, "harvested_hits": 0, "privacy_hits": 0, "privacy_misses": 0,
+            "forgotten": 0,
+        }
+
+    @staticmethod
+    def _normalize(username: str) -> str:
+        return username.strip().lstrip("@").lower()
+
+    @staticmethod
+    def _encode(user_id: int, harvested: bool) -> str:
+        return f"{user_id}:h" if harvested else str(user_id)
+
+    @staticmethod
+    def _decode(value: str) -> tuple:
+        user_id, _, flag = value.partition(":")
+        return int(user_id), flag == "h"
+
+    def _remember(self, username: str, user_id: int, harvested: bool = False):
+        self._memory[username] = (user_id, harvested)
+        self._memory.move_to_end(username)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def _count(self, field: str, amount: int = 1):
+        """Incrementa um contador local e o contador global no Redis"""
+        self.stats[field] = self.stats.get(field, 0) + amount
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                await redis_conn.hincrby(USER_INDEX_STATS_KEY, field, amount)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar contadores do índice de usuários: {e}")
+
+    async def get(self, username: str) -> Optional[int]:
+        """Retorna o user_id indexado ou None (sem nenhuma chamada ao Instagram)"""
+        key = self._normalize(username)
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            user_id, harvested = entry
+            if harvested:
+                await self._count("harvested_hits")
+            return user_id
+
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                cached = await redis_conn.hget(USER_INDEX_REDIS_KEY, key)
+                if cached:
+                    user_id, harvested = self._decode(cached)
+                    self._remember(key, user_id, harvested)
+                    self.stats["redis_hits"] += 1
+                    if harvested:
+                        await self._count("harvested_hits")
+                    return user_id
+        except Exception as e:
+            logger.error(f"Erro ao consultar índice de usuários no Redis: {e}")
+
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(InstagramUserIndex.user_id).where(InstagramUserIndex.username == key)
+                )
+                user_id = result.scalar_one_or_none()
+            if user_id is not None:
+                self._remember(key, user_id)
+                await self._store_redis({key: user_id})
+                self.stats["db_hits"] += 1
+                return user_id
+        except Exception as e:
+            logger.error(f"Erro ao consultar índice de usuários no banco: {e}")
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, username: str, user_id: int):
+        """Registra uma resolução username -> user_id"""
+        await self.put_many({username: user_id})
+
+    async def put_many(self, entries: Dict[str, int]):
+        """Registra várias resoluções (memória e Redis imediatamente, Postgres em lote)"""
+        normalized = {self._normalize(u): int(pk) for u, pk in entries.items() if u and pk}
+        new_entries = self._remember_many({u: (pk, False) for u, pk in normalized.items()})
+        if not new_entries:
+            return
+
+        await self._store_redis(new_entries)
+        self._schedule_persist(new_entries)
+        self.stats["stored"] += len(new_entries)
+
+    async def forget(self, username: str):
+        """
+        Descarta a resolução do username nas três camadas (e a privacidade colhida, que era
+        do dono anterior). A memória dos outros workers é corrigida quando eles detectam a
+        mesma divergência.
+        """
+        key = self._normalize(username)
+        self._memory.pop(key, None)
+        self._pending.pop(key, None)
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                pipe = redis_conn.pipeline(transaction=False)
+                pipe.hdel(USER_INDEX_REDIS_KEY, key)
+                pipe.delete(f"{PRIVACY_INDEX_PREFIX}{key}")
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Erro ao remover {key} do índice de usuários no Redis: {e}")
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(delete(InstagramUserIndex).where(InstagramUserIndex.username == key))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Erro ao remover {key} do índice de usuários no banco: {e}")
+        self.stats["forgotten"] += 1
+
+    async def harvest(self, users: Iterable[Any], requested_username: str):
+        """
+        Colhe em lote todos os usuários retornados por um search_users: resolução
+        username -> user_id e privacidade, gravados no Redis com um único pipeline.
+        O username procurado é registrado como resolução direta; os demais como colhidos.
+        """
+        requested = self._normalize(requested_username)
+        resolutions: Dict[str, tuple] = {}
+        privacy: Dict[str, bool] = {}
+        for user in users:
+            username = getattr(user, "username", None)
+            pk = getattr(user, "pk", None)
+            if not username or not pk:
+                continue
+            key = self._normalize(username)
+            resolutions[key] = (int(pk), key != requested)
+            if getattr(user, "is_private", None) is not None:
+                privacy[key] = bool(user.is_private)
+        if not resolutions:
+            return
+
+        new_entries = self._remember_many(resolutions)
+        harvested_count = sum(1 for key in new_entries if resolutions[key][1])
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                pipe = redis_conn.pipeline(transaction=False)
+                if new_entries:
+                    pipe.hset(USER_INDEX_REDIS_KEY, mapping={
+                        key: self._encode(*resolutions[key]) for key in new_entries
+                    })
+                for key, is_private in privacy.items():
+                    pipe.setex(f"{PRIVACY_INDEX_PREFIX}{key}", PRIVACY_INDEX_TTL, "1" if is_private else "0")
+                if harvested_count:
+                    pipe.hincrby(USER_INDEX_STATS_KEY, "harvested", harvested_count)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Erro ao gravar usuários colhidos no Redis: {e}")
+
+        self._schedule_persist(new_entries)
+        self.stats["stored"] += len(new_entries)
+        self.stats["harvested"] += harvested_count
+
+    def _remember_many(self, resolutions: Dict[str, tuple]) -> Dict[str, int]:
+        """
+        Atualiza a memória e retorna as resoluções novas (username -> user_id).
+        Uma entrada colhida nunca rebaixa uma resolução direta já conhecida.
+        """
+        new_entries: Dict[str, int] = {}
+        for username, (user_id, harvested) in resolutions.items():
+            current = self._memory.get(username)
+            if current is not None and current[0] == user_id and (harvested or not current[1]):
+                self._memory.move_to_end(username)
+                continue
+            self._remember(username, user_id, harvested)
+            new_entries[username] = user_id
+        return new_entries
+
+    def _schedule_persist(self, entries: Dict[str, int]):
+        """Agenda o upsert em lote no Postgres"""
+        if not entries:
+            return
+        self._pending.update(entries)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _store_redis(self, entries: Dict[str, int]):
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                await redis_conn.hset(USER_INDEX_REDIS_KEY, mapping={
+                    username: self._encode(user_id, self._memory.get(username, (user_id, False))[1])
+                    for username, user_id in entries.items()
+                })
+        except Exception as e:
+            logger.error(f"Erro ao gravar índice de usuários no Redis: {e}")
+
+    async def record_privacy_tier(self, tier: str):
+        """Conta qual camada respondeu uma verificação de privacidade"""
+        await self._count(f"privacy_tier:{tier}")
+
+    async def get_privacy(self, username: str) -> Optional[bool]:
+        """Retorna a privacidade colhida de uma busca recente, ou None se desconhecida"""
+        key = self._normalize(username)
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                cached = await redis_conn.get(f"{PRIVACY_INDEX_PREFIX}{key}")
+                if cached is not None:
+                    await self._count("privacy_hits")
+                    return cached == "1"
+        except Exception as e:
+            logger.error(f"Erro ao consultar índice de privacidade: {e}")
+        self.stats["privacy_misses"] += 1
+        return None
+
+    async def _flush_later(self):
+        await asyncio.sleep(USER_INDEX_FLUSH_INTERVAL)
+        await self.flush()
+
+    async def flush(self):
+        """Grava no Postgres (upsert) as resoluções pendentes"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        now = datetime.utcnow()
+        rows = [
+            {"username": username, "user_id": user_id, "created_at": now, "updated_at": now}
+            for username, user_id in pending.items()
+        ]
+        try:
+            stmt = insert(InstagramUserIndex).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[InstagramUserIndex.username],
+                set_={"user_id": stmt.excluded.user_id, "updated_at": stmt.excluded.updated_at},
+            )
+            async with AsyncSessionLocal() as session:
+                await session.execute(stmt)
+                await session.commit()
+            logger.debug(f"{len(rows)} resoluções gravadas no índice de usuários")
+        except Exception as e:
+            logger.error(f"Erro ao gravar índice de usuários no banco: {e}")
+
+    async def preload(self, limit: int = USER_INDEX_PRELOAD_LIMIT) -> int:
+        """Carrega em memória e no Redis as resoluções mais recentes do Postgres"""
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(InstagramUserIndex.username, InstagramUserIndex.user_id)
+                    .order_by(InstagramUserIndex.updated_at.desc())
+                    .limit(limit)
+                )
+                rows = result.all()
+        except Exception as e:
+            logger.error(f"Erro ao pré-carregar índice de usuários: {e}")
+            return 0
+
+        entries = {username: user_id for username, user_id in rows}
+        # Mais antigas primeiro, para que as mais recentes fiquem no topo do LRU
+        for username, user_id in reversed(rows):
+            self._remember(username, user_id)
+        if entries:
+            await self._store_redis(entries)
+        logger.info(f"Índice de usuários pré-carregado com {len(entries)} entradas")
+        return len(entries)
+
+    async def get_stats(self) -> Dict:
+        """Contadores deste worker e contadores globais (todos os workers) do Redis"""
+        lookups = sum(self.stats[k] for k in ("memory_hits", "redis_hits", "db_hits", "misses"))
+        hits = lookups - self.stats["misses"]
+        stats = {
+            "worker": {
+                **self.stats,
+                "memory_entries": len(self._memory),
+                "pending_writes": len(self._pending),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "harvested_hit_rate": round(self.stats["harvested_hits"] / lookups, 4) if lookups else 0.0,
+            }
+        }
+        try:
+            redis_conn = await get_redis()
+            if redis_conn is not None:
+                pipe = redis_conn.pipeline(transaction=False)
+                pipe.hgetall(USER_INDEX_STATS_KEY)
+                pipe.hlen(USER_INDEX_REDIS_KEY)
+                global_stats, indexed = await pipe.execute()
+                stats["global"] = {
+                    "indexed_users": indexed,
+                    "harvested": int(global_stats.get("harvested", 0)),
+                    # Cada hit em entrada colhida é um search_users evitado
+                    "harvested_hits": int(global_stats.get("harvested_hits", 0)),
+                    "privacy_hits": int(global_stats.get("privacy_hits", 0)),
+                    "privacy_tiers": {
+                        field.split(":", 1)[1]: int(value)
+                        for field, value in global_stats.items() if field.startswith("privacy_tier:")
+                    },
+                }
+        except Exception as e:
+            logger.error(f"Erro ao obter contadores do índice de usuários: {e}")
+        return stats
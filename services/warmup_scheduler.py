@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+import logging
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Atividades de pré-aquecimento executadas ao mesmo tempo (em todas as contas)
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 4))
+# Intervalo aleatório (segundos) entre dois pré-aquecimentos de uma conta
+WARMUP_MIN_INTERVAL = float(os.getenv("WARMUP_MIN_INTERVAL", 15 * 60))
+WARMUP_MAX_INTERVAL = float(os.getenv("WARMUP_MAX_INTERVAL", 45 * 60))
+# Espera após um erro inesperado na atividade
+WARMUP_ERROR_DELAY = float(os.getenv("WARMUP_ERROR_DELAY", 300))
+
+
+def warmup_interval() -> float:
+    return random.uniform(WARMUP_MIN_INTERVAL, WARMUP_MAX_INTERVAL)
+
+
+class WarmupScheduler:
+    """
+    Agenda os pré-aquecimentos de todas as contas com um único heap de timers.
+
+    Um despachante dorme até o próximo vencimento e entrega a conta a um pool fixo de
+    WARMUP_CONCURRENCY workers (fila limitada), então o número de tarefas não cresce com
+    o número de contas. run(account_id) executa a atividade e retorna o atraso até a
+    próxima (None usa o intervalo aleatório padrão). Contas pausadas continuam
+    registradas, mas não são executadas até resume().
+    """
+
+    def __init__(self, run: Callable[[str], Awaitable[Optional[float]]], concurrency: int = WARMUP_CONCURRENCY):
+        self.run = run
+        self.concurrency = max(concurrency, 1)
+        # (vencimento em time.monotonic, sequência, conta); entradas que não batem com _due são obsoletas
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._paused: Set[str] = set()
+        self._active: Set[str] = set()
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"dispatched": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.concurrency)
+        self._tasks.append(asyncio.create_task(self._dispatch_loop()))
+        self._tasks += [asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Para o despachante e os workers e esquece todos os agendamentos"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._heap.clear()
+        self._due.clear()
+        self._active.clear()
+
+    def schedule(self, account_id: str, delay: Optional[float] = None):
+        """(Re)agenda a conta para daqui a delay segundos (padrão: intervalo aleatório)"""
+        due = time.monotonic() + (warmup_interval() if delay is None else delay)
+        self._due[account_id] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, account_id))
+        # Reagendamentos deixam entradas obsoletas: reconstrói o heap se elas dominarem
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due, seq, account) for due, seq, account in self._heap if self._due.get(account) == due]
+            heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def is_scheduled(self, account_id: str) -> bool:
+        return account_id in self._due
+
+    def remove(self, account_id: str):
+        self._due.pop(account_id, None)
+        self._paused.discard(account_id)
+
+    def pause(self, account_id: str):
+        self._paused.add(account_id)
+
+    def resume(self, account_id: str):
+        if account_id in self._paused:
+            self._paused.discard(account_id)
+            if account_id in self._due and self._due[account_id] <= time.monotonic():
+                # Vencimento perdido durante a pausa: executa em breve, com jitter
+                self.schedule(account_id, random.uniform(0, 60))
+
+    def is_paused(self, account_id: str) -> bool:
+        return account_id in self._paused
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, account_id = heapq.heappop(self._heap)
+                if self._due.get(account_id) != due or account_id in self._active:
+                    continue  # obsoleta (reagendada ou removida) ou ainda em execução
+                if account_id in self._paused:
+                    continue  # mantém _due: resume() reagenda
+                self._active.add(account_id)
+                # Fila limitada: aguarda um worker livre (contrapressão)
+                await self._queue.put(account_id)
+                now = time.monotonic()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker_loop(self):
+        while True:
+            account_id = await self._queue.get()
+            delay: Optional[float] = None
+            try:
+                self.stats["dispatched"] += 1
+                delay = await self.run(account_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"❌ Erro no pré-aquecimento da conta {account_id}: {e}")
+                delay = WARMUP_ERROR_DELAY
+            finally:
+                self._active.discard(account_id)
+                self._queue.task_done()
+            if account_id in self._due:
+                self.schedule(account_id, delay)
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        next_due = min(self._due.values(), default=None)
+        return {
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "scheduled": len(self._due),
+            "paused": len(self._paused),
+            "active": len(self._active),
+            "heap_size": len(self._heap),
+            "next_in": round(max(next_due - now, 0), 1) if next_due is not None else None,
+            **self.stats,
+        }